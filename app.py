@@ -1,22 +1,52 @@
 import streamlit as st
-import time
-import json
+import logging
 from beyond_capri.local_env.db_manager import IdentityVault
 from beyond_capri.local_env.gatekeeper import Gatekeeper
-from beyond_capri.local_env.db_manager import IdentityVault
 from beyond_capri.cloud_env.a2a_orchestrator import A2AOrchestrator
+from beyond_capri.local_env.session import ConversationSession
+from beyond_capri.local_env.retention import VaultRetention
+from beyond_capri.local_env.reidentify import PSEUDONYM_PATTERN
+from beyond_capri.shared.job_runner import JobRunner
+from beyond_capri.shared import profiling
 from beyond_capri.shared.mcp_server import init_financial_db
 
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
 # Page Config
 st.set_page_config(page_title="Beyond CAPRI: Live Architecture", layout="wide")
 
+# How often the progress panel polls running jobs
+POLL_INTERVAL_S = 0.5
+
 # Initialize Backend (Cached to run once)
 @st.cache_resource
 def init_system():
     init_financial_db() # Ensure DB exists
-    return Gatekeeper(), IdentityVault(), A2AOrchestrator()
+    vault, orchestrator = IdentityVault(), A2AOrchestrator()
+    # Expires old identities in the background when VAULT_TTL is set
+    VaultRetention(vault=vault, index=orchestrator.index).start()
+    gatekeeper = Gatekeeper(vault=vault)
+    # Requests run here, off the script thread, so the page stays responsive
+    runner = JobRunner(gatekeeper, orchestrator, vault)
+    return gatekeeper, vault, orchestrator, runner
+
+@st.cache_resource
+def graph_image():
+    """The graph never changes at runtime; render it (a network call) once per process."""
+    graph = orchestrator.graph.get_graph()
+    try:
+        return graph.draw_mermaid_png(), None
+    except Exception as e:
+        return graph.draw_mermaid(), str(e)
+
+gatekeeper, vault, orchestrator, runner = init_system()
 
-gatekeeper, vault, orchestrator = init_system()
+# One conversation per browser session: entities / anchors / recent turns carry over
+if "session" not in st.session_state:
+    st.session_state.session = ConversationSession()
+if "jobs" not in st.session_state:
+    st.session_state.jobs = []
+session = st.session_state.session
 
 # --- SIDEBAR: SYSTEM STATUS & GRAPH ---
 with st.sidebar:
@@ -28,16 +58,27 @@ with st.sidebar:
     st.divider()
     
     st.subheader("🧠 LangGraph Structure")
-    st.info("Visualizing the Agent Workflow...")
-    
-    # Draw the Graph
-    try:
-        # Generate the Mermaid Image of the Graph
-        graph_png = orchestrator.graph.get_graph().draw_mermaid_png()
-        st.image(graph_png, caption="Live A2A Execution Graph")
-    except Exception as e:
-        st.warning(f"Could not render graph: {e}")
-        st.caption("Ensure Graphviz is installed to see the diagram.")
+    image, error = graph_image()
+    if error is None:
+        st.image(image, caption="Live A2A Execution Graph")
+    else:
+        st.warning(f"Could not render graph: {error}")
+        st.code(image, language="text")
+
+    st.divider()
+    st.subheader("⏱️ Profiling")
+    # Forces profiling of this session's jobs only; the process-wide PROFILE_* settings stay as configured
+    profile_requests = st.checkbox("Profile my requests", value=False)
+    st.caption(f"Collapsed stacks are written to {profiling.settings()['out_dir']}")
+
+    st.divider()
+    st.subheader("🗂️ Conversation Memory")
+    st.json(session.describe())
+    if st.button("New Conversation"):
+        runner.forget_session(session)
+        st.session_state.session = ConversationSession()
+        st.session_state.jobs = []
+        st.rerun()
 
 # --- MAIN UI ---
 st.title("🛡️ Beyond CAPRI: Privacy-Preserving AI")
@@ -52,102 +93,72 @@ with col1:
     user_input = st.text_area("Enter your request:", 
                              value="Transfer $2000 from Sarah Jones to Bob Smith.",
                              height=100)
+    use_cache = st.checkbox("Replay earlier answers to the same request (read-only requests only)", value=False)
     
     run_btn = st.button("🚀 Execute Secure Transaction", type="primary")
 
 # --- EXECUTION LOGIC ---
+# Submitting only queues the request; progress is rendered by polling below
 if run_btn and user_input:
-    
-    # 1. PHASE 1: INGESTION (Local)
-    with col2:
-        st.subheader("🔍 Behind the Screens")
-        
-        with st.status("🔒 Phase 1: Local Gatekeeper (Sanitization)", expanded=True) as status:
-            st.write("Scanning for PII...")
-            time.sleep(0.5) # UI pacing
-            
-            # RUN GATEKEEPER
-            safe_prompt = gatekeeper.detect_and_sanitize(user_input)
-            
-            # Show the Transformation
-            st.markdown(f"**Original:** `{user_input}`")
-            st.markdown(f"**Sanitized:** `{safe_prompt}`")
-            st.markdown("---")
-            
-            # Extract UUIDs for display
-            import re
-            uuids = re.findall(r"(Entity_)?[a-f0-9]{8}", safe_prompt)
-            if uuids:
-                st.json({"Detected UUIDs": uuids, "Action": "Vaulted to SQLite & Pinecone"})
-            
-            status.update(label="✅ Phase 1 Complete: PII Secured", state="complete")
-
-    # 2. PHASE 2 & 3: CLOUD REASONING (The "David" Test)
-    with col2:
-        with st.status("☁️ Phase 2: Cloud A2A Reasoning", expanded=True) as status:
-            st.write("Coordinator is querying Pinecone context...")
-            
-            # RUN CLOUD AGENTS
-            # We capture the result dictionary
-            result = orchestrator.run(safe_prompt)
-            
-            # VISUALIZE COORDINATOR THOUGHTS
+    job = runner.submit(user_input, session=session, use_cache=use_cache,
+                        profile=True if profile_requests else None)
+    if job.job_id not in st.session_state.jobs:
+        st.session_state.jobs.insert(0, job.job_id)
+
+def render_job(snap: dict):
+    """Behind the scenes of one request, as far as it has got."""
+    result, phases = snap["result"], snap["phases"]
+    header = f"`{snap['job_id']}` · {snap['input'][:60]}"
+    st.markdown(f"#### {header}")
+
+    # 1. PHASE 1: Local Gatekeeper
+    if "sanitize" in phases:
+        with st.status("✅ Phase 1 Complete: PII Secured", state="complete"):
+            st.markdown(f"**Original:** `{snap['input']}`")
+            st.markdown(f"**Sanitized:** `{result['safe_prompt']}`")
+            pseudonyms = PSEUDONYM_PATTERN.findall(result["safe_prompt"])
+            if pseudonyms:
+                st.json({"Detected UUIDs": pseudonyms, "Action": "Vaulted to SQLite & Pinecone"})
+    elif snap["status"] != "error":
+        st.status("🔒 Phase 1: Local Gatekeeper (Sanitization)", state="running")
+
+    # 2. PHASE 2: Cloud A2A reasoning (the answer streams in while it is written)
+    if "orchestrate" in phases:
+        with st.status("✅ Phase 2 Complete: Task Executed", state="complete"):
             st.info("🧠 Coordinator Plan")
-            st.markdown(f"*{result.get('current_instruction')}*")
-            
-            # VISUALIZE WORKER ACTION (The "Bad Data")
+            st.markdown(f"*{result.get('coordinator_plan')}*")
             st.warning("🛠️ Worker Execution (Raw Tool Data)")
-            raw_response = result['final_response']
-            
-            # Show the raw output (which might contain "John Doe" or "David")
-            st.code(raw_response, language="text")
-            
-            status.update(label="✅ Phase 2 Complete: Task Executed", state="complete")
-
-    # 3. PHASE 4: RE-IDENTIFICATION (Local Bridge)
-    with col2:
-        with st.status("🔐 Phase 3: Local Re-Identification", expanded=True) as status:
-            st.write("Scanning Cloud Output for UUIDs...")
-            
-            # RUN RE-ID LOGIC (Reusing logic from main.py)
-            # We recreate the function here for UI visualization
-            final_text = raw_response
-            exact_matches = re.findall(r"Entity_[a-f0-9]{8}|[a-f0-9]{8}", raw_response)
-            
-            replaced_log = {}
-            
-            for match_str in exact_matches:
-                real_identity = vault.get_real_identity(match_str)
-                if not real_identity:
-                    if "Entity_" in match_str:
-                        real_identity = vault.get_real_identity(match_str.replace("Entity_", ""))
-                    else:
-                        real_identity = vault.get_real_identity(f"Entity_{match_str}")
-
-                if real_identity:
-                    original_name = real_identity.get("original_text", "Unknown")
-                    replaced_log[match_str] = original_name
-                    
-                    # Perform Swap
-                    final_text = final_text.replace(match_str, original_name)
-                    # Simple heuristic cleanup for demo
-                    final_text = final_text.replace("John Doe", original_name)
-                    final_text = final_text.replace("David Smith", original_name)
-                    final_text = final_text.replace("Jane Smith", original_name)
-
-            if replaced_log:
-                st.success("UUIDs Resolved:")
-                st.json(replaced_log)
-            else:
-                st.write("No UUIDs found to restore.")
-                
-            status.update(label="✅ Phase 3 Complete: Identity Restored", state="complete")
-
-    # 4. FINAL OUTPUT (Chat Column)
-    with col1:
-        st.divider()
-        st.success("🎉 Final Secure Response")
-        st.chat_message("assistant").write(final_text)
-        
-        # Add 'Download Receipt' simulation
-        st.button("📄 Download Transaction Receipt")
\ No newline at end of file
+            st.code(result["cloud_response"], language="text")
+    elif "sanitize" in phases and snap["status"] != "error":
+        with st.status("☁️ Phase 2: Cloud A2A Reasoning", state="running", expanded=True):
+            st.code(snap["partial"] or "Coordinator is querying Pinecone context...", language="text")
+
+    # 3. PHASE 3: Local re-identification
+    if "reidentify" in phases:
+        with st.status("✅ Phase 3 Complete: Identity Restored", state="complete"):
+            st.json(result.get("timings", {}))
+        label = "🎉 Final Secure Response" + (" (REPLAY of an earlier answer, nothing was re-run)"
+                                             if snap["cached"] else "")
+        st.success(f"{label} · {snap['elapsed_s']:.1f}s")
+        st.chat_message("assistant").write(result["final_response"])
+
+    if snap["status"] == "error":
+        st.error(f"Request failed: {snap['error']}")
+    st.divider()
+
+def render_jobs():
+    snaps = [runner.get(job_id) for job_id in st.session_state.jobs]
+    snaps = [job.snapshot() for job in snaps if job is not None]
+    running = sum(1 for s in snaps if s["status"] in ("queued", "running"))
+    st.subheader("🔍 Behind the Screens")
+    st.caption(f"{running} request(s) in flight, {len(snaps) - running} finished")
+    for snap in snaps:
+        render_job(snap)
+
+with col2:
+    # Only this panel reruns while polling; the rest of the page stays interactive
+    if hasattr(st, "fragment"):
+        st.fragment(run_every=POLL_INTERVAL_S)(render_jobs)()
+    else:
+        render_jobs()
+        st.button("🔄 Refresh progress")
@@ -0,0 +1,105 @@
+"""
+Masking throughput on large documents: the span engine (local_env/masking.py)
+vs. the old one-str.replace-per-entity loop.
+
+Builds a synthetic document (default 1 MB) mentioning thousands of entities,
+including names that are prefixes of other names ("Sarah" / "Sarah Jones"),
+then checks both approaches for leaks and for corrupted longer names.
+
+Usage:
+    python benchmarks/bench_masking.py [--size-mb 1] [--entities 5000] [--json out.json]
+"""
+import os
+import sys
+import time
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from beyond_capri.local_env import masking
+
+FIRST = ["Sarah", "Bob", "Alice", "David", "Maria", "Chen", "Priya", "Omar", "Lena", "Tom"]
+FILLER = ("The account holder requested a transfer and the compliance team reviewed the "
+          "daily limit policy before approving the payment. ").split()
+
+def make_entities(n: int, seed: int = 0) -> list:
+    """n distinct full names, plus every first name on its own (the substring trap)."""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        names.add(f"{rng.choice(FIRST)} {rng.choice(FIRST)}son{rng.randrange(10 ** 6)}")
+    return sorted(names) + FIRST
+
+def make_document(entities: list, size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(entities) if rng.random() < 0.08 else rng.choice(FILLER)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+def replacements_for(entities: list) -> dict:
+    return {name: f"Entity_{i:08x}" for i, name in enumerate(entities)}
+
+def legacy_mask(text: str, replacements: dict) -> str:
+    """What the Gatekeeper used to do: one full-text replace per entity, in detection order."""
+    for original, safe_id in replacements.items():
+        if original in text:
+            text = text.replace(original, safe_id)
+    return text
+
+def check(masked: str, entities: list) -> dict:
+    full_names = [e for e in entities if " " in e]
+    return {
+        "leaked_full_names": sum(1 for e in full_names if e in masked),
+        # Every surname ends in 'son<n>'; any left over is a fragment of a broken name,
+        # e.g. 'Entity_00000003son42' after 'Sarah' was replaced inside 'Sarahson42'
+        "broken_full_names": masked.count("son"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--entities", type=int, default=5000)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    entities = make_entities(args.entities)
+    text = make_document(entities, int(args.size_mb * 1_000_000))
+    # Short names first, as an LLM often reports them, which is the worst case for replace()
+    replacements = replacements_for(sorted(entities, key=len))
+    print(f"[Bench] {len(text) / 1e6:.2f} MB document, {len(replacements)} entities")
+
+    results = {}
+
+    t0 = time.perf_counter()
+    legacy = legacy_mask(text, replacements)
+    results["legacy_replace"] = {"seconds": time.perf_counter() - t0, **check(legacy, entities)}
+
+    t0 = time.perf_counter()
+    result = masking.mask(text, replacements)
+    elapsed = time.perf_counter() - t0
+    results["span_engine"] = {"seconds": elapsed, "spans": len(result.spans), **check(result.text, entities)}
+
+    t0 = time.perf_counter()
+    restored = result.offsets.restore(result.text)
+    results["span_engine"]["restore_seconds"] = time.perf_counter() - t0
+    results["span_engine"]["round_trip_ok"] = restored == text
+
+    print(f"{'approach':<16}{'seconds':>10}{'leaked':>9}{'broken':>9}")
+    for name, r in results.items():
+        print(f"{name:<16}{r['seconds']:>10.3f}{r['leaked_full_names']:>9}{r['broken_full_names']:>9}")
+    print(f"span engine: {results['span_engine']['spans']} spans, restore "
+          f"{results['span_engine']['restore_seconds'] * 1000:.1f} ms, "
+          f"round trip {'ok' if results['span_engine']['round_trip_ok'] else 'MISMATCH'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"bytes": len(text), "entities": len(replacements), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Recall vs. memory for the local vector index storage formats.
+
+Embeds the raw document corpus (500-char windows, like ingest_docs.py, with
+overlap to get more rows), then compares each storage format's top-k against
+exact float32 search.
+
+Sizes: quantized formats keep a float32 copy of every row for the exact rerank,
+so "total MB" (scan + rerank) is what each format really stores. "resident MB"
+is what stays in RAM after flushing to disk, reloading (arrays are memory-mapped)
+and upserting one more vector; mapped pages are file-backed and not counted.
+
+Usage:
+    python benchmarks/bench_quantization.py [--top-k 5] [--synthetic 50000] [--json out.json]
+"""
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from beyond_capri.local_env.local_index import LocalVectorIndex, normalize
+
+DOCS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "beyond_capri", "local_env", "raw_documents")
+
+# (label, dtype, rerank_factor)
+CONFIGS = [
+    ("float32", "float32", 1),
+    ("float16 + rerank", "float16", 4),
+    ("int8", "int8", 1),
+    ("int8 + rerank", "int8", 4),
+]
+
+def load_corpus(window: int = 500, stride: int = 100):
+    chunks, queries = [], []
+    for filename in sorted(os.listdir(DOCS_DIR)):
+        if not filename.endswith(".txt"):
+            continue
+        with open(os.path.join(DOCS_DIR, filename), encoding="utf-8") as f:
+            text = f.read()
+        chunks += [text[i:i + window] for i in range(0, max(len(text) - window, 0) + 1, stride)]
+        queries += [line.strip() for line in text.splitlines() if len(line.strip()) > 30]
+    return chunks, queries
+
+def embed_corpus(max_queries: int):
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    chunks, queries = load_corpus()
+    queries = queries[:max_queries]
+    print(f"[Bench] Embedding {len(chunks)} chunks and {len(queries)} queries...")
+    docs = model.encode(chunks, normalize_embeddings=True, convert_to_numpy=True, batch_size=64)
+    qs = model.encode(queries, normalize_embeddings=True, convert_to_numpy=True, batch_size=64)
+    return docs.astype(np.float32), qs.astype(np.float32)
+
+def synthetic(n: int, n_queries: int, dim: int = 384, seed: int = 0):
+    """Clustered random vectors, closer to real embeddings than pure noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 200, 1), dim))
+    docs = centers[rng.integers(len(centers), size=n)] + 0.5 * rng.normal(size=(n, dim))
+    qs = docs[rng.integers(n, size=n_queries)] + 0.3 * rng.normal(size=(n_queries, dim))
+    return normalize(docs), normalize(qs)
+
+def python_list_bytes(n: int, dim: int) -> int:
+    """What the old .tolist() representation costs: a list of boxed floats per vector."""
+    return n * (sys.getsizeof([0.0] * dim) + dim * sys.getsizeof(0.0))
+
+def run(docs: np.ndarray, queries: np.ndarray, top_k: int):
+    exact = np.argsort(-(queries @ docs.T), axis=1)[:, :top_k]
+    ids = [f"v{i}" for i in range(len(docs))]
+    results = []
+
+    for label, dtype, rerank in CONFIGS:
+        index = LocalVectorIndex(dtype=dtype, rerank_factor=rerank)
+        for start in range(0, len(docs), 1000):
+            index.upsert([(ids[i], docs[i], {}) for i in range(start, min(start + 1000, len(docs)))])
+
+        hits = 0
+        t0 = time.perf_counter()
+        for qi, q in enumerate(queries):
+            found = {int(m.id[1:]) for m in index.query(q, top_k=top_k).matches}
+            hits += len(found & set(exact[qi].tolist()))
+        elapsed = time.perf_counter() - t0
+
+        mem = index.memory_usage()[""]
+        results.append({
+            "config": label,
+            f"recall@{top_k}": hits / (len(queries) * top_k),
+            "scan_bytes": mem["scan"],
+            "rerank_bytes": mem["rerank"],
+            "total_bytes": mem["total"],
+            "resident_bytes": resident_after_reload(docs, ids, dtype, rerank),
+            "query_ms": 1000 * elapsed / len(queries),
+        })
+    return results
+
+def resident_after_reload(docs: np.ndarray, ids: list, dtype: str, rerank: int) -> int:
+    """RAM held by a flushed, reloaded index after one more upsert."""
+    path = tempfile.mkdtemp(prefix="bench_quant_")
+    try:
+        index = LocalVectorIndex(path=path, dimension=docs.shape[1], dtype=dtype, rerank_factor=rerank)
+        index.upsert_arrays(ids, docs)
+        index.flush()
+        index = LocalVectorIndex(path=path, dimension=docs.shape[1], dtype=dtype, rerank_factor=rerank)
+        index.upsert([("extra", docs[0], {})])
+        return index.memory_usage()[""]["resident"]
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the corpus")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        docs, queries = synthetic(args.synthetic, args.queries)
+    else:
+        docs, queries = embed_corpus(args.queries)
+
+    results = run(docs, queries, args.top_k)
+    baseline = python_list_bytes(len(docs), docs.shape[1])
+
+    print(f"\n{len(docs)} vectors x {docs.shape[1]} dims, {len(queries)} queries, "
+          f"Python-list baseline: {baseline / 1e6:.1f} MB")
+    print(f"{'config':<18}{'recall@' + str(args.top_k):>10}{'scan MB':>10}{'rerank MB':>11}"
+          f"{'total MB':>10}{'resident MB':>13}{'ms/query':>10}")
+    for r in results:
+        print(f"{r['config']:<18}{r[f'recall@{args.top_k}']:>10.3f}{r['scan_bytes'] / 1e6:>10.2f}"
+              f"{r['rerank_bytes'] / 1e6:>11.2f}{r['total_bytes'] / 1e6:>10.2f}"
+              f"{r['resident_bytes'] / 1e6:>13.2f}{r['query_ms']:>10.3f}")
+    print("(total includes the float32 rerank copy; resident is after flush, reload and one upsert)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(docs), "python_list_bytes": baseline, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Concurrent load generator for the full privacy pipeline
+(Gatekeeper -> A2AOrchestrator.run -> re-identification).
+
+Replays a JSONL prompt corpus ({"prompt": ...} per line) either closed-loop
+(--concurrency N users, each sending its next request as soon as the last one
+finishes) or open-loop (--rate R requests/s, Poisson arrivals). Reports
+per-phase p50/p95/p99, throughput, error rates and resource use (RSS, threads,
+SQLite lock waits).
+
+Usage:
+    python benchmarks/load_test.py --concurrency 50 --requests 500
+    python benchmarks/load_test.py --rate 20 --duration 60 --latency ollama=300,groq=800
+    python benchmarks/load_test.py --backend real --concurrency 5 --requests 20
+    python benchmarks/load_test.py --concurrency 20 --groq-quota 600 --groq-rpm 570
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import resource
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+from run_benchmarks import load_prompts, parse_latency, PROMPTS_PATH  # noqa: E402
+
+def percentile(samples: list, q: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(q / 100 * len(ordered)), len(ordered) - 1)]
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux /proc), falling back to the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class ResourceMonitor(threading.Thread):
+    """Samples RSS and thread count in the background while the load runs."""
+    def __init__(self, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.rss = []
+        self.threads = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.rss.append(rss_bytes())
+            self.threads.append(threading.active_count())
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> dict:
+        self._stop_event.set()
+        self.join()
+        return {
+            "rss_start_mb": self.rss[0] / 1e6 if self.rss else None,
+            "rss_peak_mb": max(self.rss) / 1e6 if self.rss else None,
+            "threads_peak": max(self.threads) if self.threads else None,
+        }
+
+class LoadRun:
+    def __init__(self, pipeline: dict, prompts: list):
+        from beyond_capri.shared.pipeline import process_request
+        self.process_request = process_request
+        self.pipeline = pipeline
+        self.prompts = prompts
+        self.lock = threading.Lock()
+        self.phase_samples = {"sanitize": [], "orchestrate": [], "reidentify": [], "total": [], "queue_wait": []}
+        self.errors = Counter()
+        self.completed = 0
+
+    def one(self, i: int, scheduled_at: float = None):
+        started = time.perf_counter()
+        try:
+            result = self.process_request(
+                self.pipeline["gatekeeper"], self.pipeline["orchestrator"], self.pipeline["vault"],
+                self.prompts[i % len(self.prompts)]
+            )
+        except Exception as e:
+            with self.lock:
+                self.errors[type(e).__name__] += 1
+            return
+        finished = time.perf_counter()
+        with self.lock:
+            self.completed += 1
+            for phase, seconds in result["timings"].items():
+                self.phase_samples[phase].append(seconds)
+            self.phase_samples["total"].append(finished - (scheduled_at or started))
+            if scheduled_at is not None:
+                self.phase_samples["queue_wait"].append(started - scheduled_at)
+
+    def closed_loop(self, concurrency: int, requests: int, duration: float):
+        counter = iter(range(requests if requests else 10 ** 12))
+        deadline = time.perf_counter() + duration if duration else None
+        counter_lock = threading.Lock()
+
+        def user():
+            while deadline is None or time.perf_counter() < deadline:
+                with counter_lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                self.one(i)
+
+        threads = [threading.Thread(target=user, daemon=True) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def open_loop(self, rate: float, requests: int, duration: float, max_inflight: int, seed: int = 0):
+        rng = random.Random(seed)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+            i = 0
+            next_at = start
+            while (not requests or i < requests) and (not duration or next_at - start < duration):
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.one, i, next_at)
+                i += 1
+                next_at += rng.expovariate(rate)
+
+    def report(self, elapsed: float) -> dict:
+        attempted = self.completed + sum(self.errors.values())
+        phases = {
+            phase: {
+                "count": len(samples),
+                "p50_ms": _ms(percentile(samples, 50)),
+                "p95_ms": _ms(percentile(samples, 95)),
+                "p99_ms": _ms(percentile(samples, 99)),
+                "max_ms": _ms(max(samples) if samples else None),
+            }
+            for phase, samples in self.phase_samples.items() if samples
+        }
+        return {
+            "elapsed_s": elapsed,
+            "requests": attempted,
+            "completed": self.completed,
+            "throughput_rps": self.completed / elapsed if elapsed else None,
+            "error_rate": sum(self.errors.values()) / attempted if attempted else 0.0,
+            "errors": dict(self.errors),
+            "phases": phases,
+        }
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+def build_real_pipeline() -> dict:
+    from beyond_capri.local_env.gatekeeper import Gatekeeper
+    from beyond_capri.local_env.db_manager import IdentityVault
+    from beyond_capri.cloud_env.a2a_orchestrator import A2AOrchestrator
+    return {"gatekeeper": Gatekeeper(), "orchestrator": A2AOrchestrator(), "vault": IdentityVault()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", default=PROMPTS_PATH, help="JSONL file with a 'prompt' field per line")
+    parser.add_argument("--backend", choices=("stub", "real"), default="stub")
+    parser.add_argument("--latency", default="ollama=300,groq=800,index=30,embed=10",
+                        help="Stub backend latency in ms (ignored with --backend real)")
+    parser.add_argument("--groq-quota", type=float, default=0,
+                        help="Stub Groq quota in requests/min; calls beyond it get a 429")
+    parser.add_argument("--groq-rpm", type=float, default=0,
+                        help="Client-side Groq rate limit in requests/min for stub runs (0 = off)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Closed-loop virtual users")
+    parser.add_argument("--rate", type=float, default=0, help="Open-loop arrival rate (req/s); overrides --concurrency")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Open-loop worker cap")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests (0 = until --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="Seconds to run (0 = until --requests)")
+    parser.add_argument("--out", help="Write the JSON report here")
+    args = parser.parse_args()
+    if not args.requests and not args.duration:
+        parser.error("one of --requests or --duration must be set")
+
+    logging.basicConfig(level=logging.WARNING)
+
+    try:
+        if args.backend == "stub":
+            pipeline = stubs.build_offline_pipeline(**parse_latency(args.latency),
+                                                    groq_quota_rpm=args.groq_quota, groq_rpm=args.groq_rpm)
+        else:
+            pipeline = build_real_pipeline()
+        from beyond_capri.shared import telemetry
+
+        run = LoadRun(pipeline, load_prompts(args.prompts))
+        telemetry.get_telemetry().reset()
+        monitor = ResourceMonitor()
+        monitor.start()
+        start = time.perf_counter()
+        if args.rate:
+            run.open_loop(args.rate, args.requests, args.duration, args.max_inflight)
+        else:
+            run.closed_loop(args.concurrency, args.requests, args.duration)
+        elapsed = time.perf_counter() - start
+        resources = monitor.stop()
+    finally:
+        stubs.cleanup()
+
+    tel = telemetry.get_telemetry()
+    resources["sqlite_lock_wait_ms"] = {
+        k: _ms(v) for k, v in tel.percentiles("sqlite_lock_wait_seconds", db="vault").items()
+    }
+    resources["sqlite_lock_timeouts"] = tel.counter("sqlite_lock_timeouts_total", db="vault")
+    resources["vault_cache"] = pipeline["vault"].cache_stats()
+    resources["llm_retries"] = tel.counter("llm_retries_total", provider="groq", status="429")
+    resources["llm_coalesced"] = sum(v for k, v in tel.summary()["counters"].items()
+                                     if k.startswith("llm_coalesced_total"))
+
+    report = run.report(elapsed)
+    report.update({
+        "mode": f"open-loop {args.rate} req/s" if args.rate else f"closed-loop {args.concurrency} users",
+        "backend": args.backend,
+        "resources": resources,
+        "spans": {k: v for k, v in tel.summary()["histograms"].items() if k.startswith("span_duration")},
+    })
+
+    print(f"\n=== LOAD TEST: {report['mode']} ({args.backend} backends) ===")
+    print(f"Completed {report['completed']}/{report['requests']} in {elapsed:.1f}s "
+          f"-> {report['throughput_rps']:.2f} req/s, error rate {report['error_rate']:.1%}")
+    print(f"{'phase':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for phase, stats in report["phases"].items():
+        print(f"{phase:<12}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    lock_wait = " / ".join(f"{k} {v:.1f}" for k, v in resources["sqlite_lock_wait_ms"].items()) or "n/a"
+    print(f"RSS {resources['rss_start_mb']:.0f} -> peak {resources['rss_peak_mb']:.0f} MB, "
+          f"peak threads {resources['threads_peak']}")
+    print(f"SQLite lock wait (ms): {lock_wait}, lock timeouts: {resources['sqlite_lock_timeouts']}")
+    cache = resources["vault_cache"]
+    print(f"Vault cache: hit rate {cache['hit_rate']:.1%}, miss rate {cache['miss_rate']:.1%}, "
+          f"false positives {cache['false_positive_rate']:.1%}, SQLite avoided {cache['sqlite_avoided_rate']:.1%}")
+    print(f"LLM 429 retries: {resources['llm_retries']}, coalesced calls: {resources['llm_coalesced']}")
+    if report["errors"]:
+        print(f"Errors: {report['errors']}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[Load] Report written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Offline benchmark suite for the privacy pipeline.
+
+Runs every stage against the deterministic stubs in benchmarks/stubs.py (no
+Ollama, Pinecone or Groq needed) and writes machine-readable results. Passing
+--baseline compares against a previous results file and exits non-zero when a
+benchmark's p50 regressed by more than --threshold.
+
+Usage:
+    python benchmarks/run_benchmarks.py --out bench_results.json
+    python benchmarks/run_benchmarks.py --baseline bench_results.json --threshold 0.25
+    python benchmarks/run_benchmarks.py --latency ollama=300,groq=800,index=30,embed=5
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+import platform
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs  # noqa: E402
+
+PROMPTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "prompts.jsonl")
+
+def load_prompts(path: str = PROMPTS_PATH) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["prompt"] for line in f if line.strip()]
+
+def measure(fn, iterations: int, warmup: int = 3) -> dict:
+    """Calls fn(i) repeatedly and returns latency stats in milliseconds."""
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+
+    def pct(q):
+        return samples[min(int(q / 100 * len(samples)), len(samples) - 1)]
+
+    return {
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "ops_per_s": 1000 * len(samples) / sum(samples) if sum(samples) else None,
+    }
+
+def run_suite(pipeline: dict, prompts: list, iterations: int, only: list = None) -> dict:
+    from beyond_capri.local_env.reidentify import re_identify_response
+    from beyond_capri.cloud_env.tools import search_knowledge_base
+
+    gatekeeper = pipeline["gatekeeper"]
+    orchestrator = pipeline["orchestrator"]
+    vault = pipeline["vault"]
+    store = pipeline["store"]
+
+    # Ids that exist in the vault, for the lookup / re-identification benchmarks
+    known_ids = []
+    for i in range(50):
+        safe_id = f"Entity_{uuid.uuid4().hex[:8]}"
+        vault.save_identity(safe_id, {"original_text": f"Person {i}", "type": "PERSON", "full_context": "Sender"})
+        known_ids.append(safe_id)
+    safe_prompts = [gatekeeper.detect_and_sanitize(p) for p in prompts]
+    cloud_response = "Transfer confirmed. " + " ".join(
+        f"{sid} was notified (ref {uuid.uuid4().hex[:8]})." for sid in known_ids[:10]
+    )
+
+    def sanitize(i):
+        gatekeeper.detect_and_sanitize(prompts[i % len(prompts)])
+
+    def vault_write(i):
+        vault.save_identity(f"Entity_{uuid.uuid4().hex[:8]}", {"original_text": "Bench", "type": "PERSON"})
+
+    def vault_read(i):
+        vault.get_real_identity(known_ids[i % len(known_ids)])
+
+    def reidentify(i):
+        re_identify_response(cloud_response, vault)
+
+    def embedding(i):
+        store.embed(prompts[i % len(prompts)])
+
+    def retrieval(i):
+        search_knowledge_base.invoke({"query": prompts[i % len(prompts)]})
+
+    def full_graph(i):
+        orchestrator.run(safe_prompts[i % len(safe_prompts)])
+
+    def end_to_end(i):
+        safe = gatekeeper.detect_and_sanitize(prompts[i % len(prompts)])
+        result = orchestrator.run(safe)
+        re_identify_response(result["final_response"], vault)
+
+    benchmarks = {
+        "sanitize": sanitize,
+        "vault_write": vault_write,
+        "vault_read": vault_read,
+        "reidentify": reidentify,
+        "embedding": embedding,
+        "retrieval": retrieval,
+        "full_graph": full_graph,
+        "end_to_end": end_to_end,
+    }
+    results = {}
+    for name, fn in benchmarks.items():
+        if only and name not in only:
+            continue
+        results[name] = measure(fn, iterations)
+        print(f"{name:<14} p50 {results[name]['p50_ms']:>9.3f} ms   p99 {results[name]['p99_ms']:>9.3f} ms")
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Returns [(name, baseline_p50, current_p50, ratio)] for every regression."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("p50_ms"):
+            continue
+        ratio = current["p50_ms"] / base["p50_ms"]
+        if ratio > 1 + threshold:
+            regressions.append((name, base["p50_ms"], current["p50_ms"], ratio))
+    return regressions
+
+def parse_latency(spec: str) -> dict:
+    """'ollama=300,groq=800' -> {'ollama_ms': 300.0, 'groq_ms': 800.0}"""
+    latency = {}
+    for part in filter(None, (spec or "").split(",")):
+        key, value = part.split("=")
+        if key not in ("ollama", "groq", "index", "embed"):
+            raise ValueError(f"Unknown backend in --latency: {key}")
+        latency[f"{key}_ms"] = float(value)
+    return latency
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--latency", default="", help="Injected backend latency in ms, e.g. ollama=300,groq=800")
+    parser.add_argument("--only", default="", help="Comma-separated subset of benchmarks")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p50 slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    latency = parse_latency(args.latency)
+    try:
+        pipeline = stubs.build_offline_pipeline(**latency)
+        results = run_suite(pipeline, load_prompts(), args.iterations, [n for n in args.only.split(",") if n])
+    finally:
+        stubs.cleanup()
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "iterations": args.iterations,
+        "latency": latency,
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[Bench] Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, base, current, ratio in regressions:
+            print(f"[Bench] REGRESSION {name}: p50 {base:.3f} ms -> {current:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"[Bench] No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
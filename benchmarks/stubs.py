@@ -0,0 +1,262 @@
+"""
+Deterministic offline stand-ins for Ollama, the embedding model, Pinecone and
+Groq, so the pipeline can be benchmarked without any external service.
+
+Each stub can inject latency (mean +/- jitter, in ms) to mimic the real backend.
+build_offline_pipeline() points the config at the local vector backend and a
+scratch directory, so it must run before anything imports config.
+"""
+import os
+import re
+import sys
+import json
+import time
+import types
+import random
+import shutil
+import hashlib
+import tempfile
+import threading
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="beyond_capri_bench_")
+
+from beyond_capri.local_env.local_index import LocalVectorIndex
+
+# Two capitalized words in a row, e.g. "Sarah Jones"
+NAME_PATTERN = re.compile(r"\b[A-Z][a-z]+ [A-Z][a-z]+\b")
+ENTITY_PATTERN = re.compile(r"Entity_[a-f0-9]{8}")
+
+class Latency:
+    """Sleeps for mean_ms +/- jitter_ms; seeded so runs are reproducible."""
+    def __init__(self, mean_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.mean_ms <= 0 and self.jitter_ms <= 0:
+            return
+        with self._lock:
+            delay = self.mean_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(delay, 0.0) / 1000.0)
+
+NO_LATENCY = Latency()
+
+class StubOllamaChat:
+    """Replaces ollama.chat for the Gatekeeper: reports every 'First Last' as a PERSON."""
+    def __init__(self, latency: Latency = NO_LATENCY):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, model: str, messages: list, format: str = None, **kwargs):
+        self.latency.wait()
+        self.calls += 1
+        text = messages[-1]["content"]
+        names = list(dict.fromkeys(NAME_PATTERN.findall(text)))
+        entities = [
+            {"text": name, "type": "PERSON", "context": "Account holder mentioned in request"}
+            for name in names
+        ]
+        return {"message": {"content": json.dumps({"entities": entities})}}
+
+class StubEmbedder:
+    """
+    Feature-hashed bag of words, normalized. Stable across runs and processes,
+    and texts sharing words still land close together, so retrieval is meaningful.
+    """
+    def __init__(self, dim: int = 384, latency: Latency = NO_LATENCY):
+        self.dim = dim
+        self.latency = latency
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            h = int.from_bytes(digest, "little")
+            vec[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def encode(self, texts, normalize_embeddings: bool = True, convert_to_numpy: bool = True, **kwargs):
+        self.latency.wait()
+        if isinstance(texts, str):
+            return self._encode_one(texts)
+        return np.stack([self._encode_one(t) for t in texts]) if texts else np.empty((0, self.dim), np.float32)
+
+class LatencyIndex:
+    """Wraps a LocalVectorIndex and adds per-call latency, like a remote Pinecone index."""
+    def __init__(self, index: LocalVectorIndex, latency: Latency = NO_LATENCY):
+        self.index = index
+        self.latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self.index, name)
+        if name not in ("upsert", "fetch", "query", "delete", "describe_index_stats"):
+            return attr
+
+        def call(*args, **kwargs):
+            self.latency.wait()
+            return attr(*args, **kwargs)
+        return call
+
+class StubRateLimitError(Exception):
+    """Shaped like groq.RateLimitError: status_code 429 plus a Retry-After header."""
+    def __init__(self, retry_after: float):
+        super().__init__("Rate limit reached (stub quota)")
+        self.status_code = 429
+        self.response = types.SimpleNamespace(headers={"retry-after": f"{retry_after:.3f}"})
+
+class StubMessage:
+    """The parts of a LangChain AIMessage the orchestrator reads."""
+    def __init__(self, content: str = "", tool_calls: list = None):
+        self.content = content
+        self.tool_calls = tool_calls or []
+
+class _BoundStubChat:
+    def __init__(self, parent, tools):
+        self.parent = parent
+        self.tool_names = [getattr(t, "name", str(t)) for t in tools]
+
+    def invoke(self, messages):
+        return self.parent._respond(messages, with_tools=True)
+
+class StubChatModel:
+    """
+    Replaces ChatGroq. The coordinator gets a short plan, the worker always asks
+    for get_account_balance on the first Entity id (read-only, so the financial
+    DB is never mutated), and the final call echoes the ids back for re-identification.
+    """
+    def __init__(self, latency: Latency = NO_LATENCY, quota_rpm: float = 0):
+        self.latency = latency
+        self.calls = 0
+        self.rejected = 0
+        # Sliding one-minute window of accepted calls, like Groq's requests-per-minute quota
+        self.quota_rpm = quota_rpm
+        self._window = []
+        self._lock = threading.Lock()
+
+    def _check_quota(self):
+        if not self.quota_rpm:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 60.0]
+            if len(self._window) >= self.quota_rpm:
+                self.rejected += 1
+                raise StubRateLimitError(60.0 - (now - self._window[0]))
+            self._window.append(now)
+
+    def bind(self, **kwargs):
+        # Generation settings such as max_tokens don't change the canned replies
+        return self
+
+    def bind_tools(self, tools):
+        return _BoundStubChat(self, tools)
+
+    def invoke(self, messages):
+        return self._respond(messages, with_tools=False)
+
+    def stream(self, messages):
+        words = self._respond(messages, with_tools=False).content.split(" ")
+        for i, word in enumerate(words):
+            yield StubMessage(word if i == 0 else " " + word)
+
+    def _respond(self, messages, with_tools: bool):
+        self._check_quota()
+        self.latency.wait()
+        self.calls += 1
+        prompt = messages[-1].content
+        ids = list(dict.fromkeys(ENTITY_PATTERN.findall(prompt)))
+
+        if with_tools:
+            account = ids[0] if ids else "Entity_sender"
+            return StubMessage(tool_calls=[{
+                "name": "get_account_balance",
+                "args": {"account_id": account},
+                "id": f"call_{self.calls}",
+            }])
+        if "COORDINATOR" in prompt:
+            targets = ", ".join(ids) or "the sender"
+            return StubMessage(f"1. Check the balance for {targets}. 2. Report the result.")
+        return StubMessage(f"Confirmed. Request processed for {', '.join(ids) or 'the account'}.")
+
+def build_offline_pipeline(ollama_ms: float = 0, groq_ms: float = 0, index_ms: float = 0, embed_ms: float = 0,
+                           jitter: float = 0.1, seed: int = 0, corpus: bool = True,
+                           groq_quota_rpm: float = 0, groq_rpm: float = 0):
+    """
+    Wires Gatekeeper, A2AOrchestrator and IdentityVault to the stubs, with a
+    scratch vault / financial DB / in-memory index. Returns a dict of components.
+    jitter is a fraction of each mean latency. groq_quota_rpm makes the Groq stub
+    answer 429 beyond that many calls per minute; groq_rpm is the client-side
+    token-bucket budget (0 = unthrottled, unlike the Config default).
+    """
+    if "config" in sys.modules and sys.modules["config"].Config.VECTOR_BACKEND != "local":
+        raise RuntimeError("build_offline_pipeline() must run before config is imported")
+    os.environ["VECTOR_BACKEND"] = "local"
+    os.environ["LOCAL_INDEX_DIR"] = os.path.join(SCRATCH_DIR, "vector_index")
+
+    from beyond_capri.local_env.db_manager import IdentityVault
+    from beyond_capri.local_env.vector_store import AnchorStore
+    from beyond_capri.local_env.gatekeeper import Gatekeeper
+    from beyond_capri.cloud_env import tools
+    from beyond_capri.cloud_env.a2a_orchestrator import A2AOrchestrator
+    from beyond_capri.shared import mcp_server, llm_client
+
+    def latency(ms, offset):
+        return Latency(ms, ms * jitter, seed + offset)
+
+    # Scratch copies so benchmarks never touch the committed databases
+    fin_db = os.path.join(SCRATCH_DIR, "financial_data.db")
+    if not os.path.exists(fin_db):
+        shutil.copyfile(mcp_server.DB_PATH, fin_db)
+    mcp_server.DB_PATH = fin_db
+
+    embedder = StubEmbedder(latency=latency(embed_ms, 1))
+    index = LatencyIndex(LocalVectorIndex(), latency(index_ms, 2))
+    vault = IdentityVault(db_path=os.path.join(SCRATCH_DIR, f"identity_vault_{seed}.db"))
+    store = AnchorStore(model=embedder, index=index)
+    tools.configure(index_override=index, model_override=embedder)
+
+    # The Config limits are tuned for the real quotas; the stubs get their own
+    llm_client.configure("ollama", max_concurrency=64)
+    llm_client.configure("groq", max_concurrency=64, requests_per_minute=groq_rpm,
+                         burst=max(int(groq_rpm / 60), 1), max_retries=8, backoff_base=0.05)
+
+    ollama_stub = StubOllamaChat(latency(ollama_ms, 3))
+    groq_stub = StubChatModel(latency(groq_ms, 4), quota_rpm=groq_quota_rpm)
+    gatekeeper = Gatekeeper(vault=vault, anchor_store=store, chat_fn=ollama_stub)
+    orchestrator = A2AOrchestrator(llm=groq_stub, index=index)
+
+    if corpus:
+        load_corpus(store)
+
+    return {
+        "gatekeeper": gatekeeper,
+        "orchestrator": orchestrator,
+        "vault": vault,
+        "store": store,
+        "index": index,
+        "embedder": embedder,
+        "ollama": ollama_stub,
+        "groq": groq_stub,
+    }
+
+def load_corpus(store, chunk_size: int = 500):
+    """Loads raw_documents into the document namespace without the LLM sanitization pass."""
+    docs_dir = os.path.join(ROOT, "beyond_capri", "local_env", "raw_documents")
+    for filename in sorted(os.listdir(docs_dir)):
+        if not filename.endswith(".txt"):
+            continue
+        with open(os.path.join(docs_dir, filename), encoding="utf-8") as f:
+            text = f.read()
+        for i in range(0, len(text), chunk_size):
+            store.store_document_chunk(f"doc_{filename}_{i // chunk_size}", text[i:i + chunk_size],
+                                       {"source": filename, "chunk_index": i // chunk_size})
+
+def cleanup():
+    shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
@@ -1,97 +1,164 @@
 import os
-import json
+import logging
 from langgraph.graph import StateGraph, END
 from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage
-from pinecone import Pinecone
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 
 from config import Config
-from beyond_capri.cloud_env.state import AgentState
+from beyond_capri.cloud_env.state import AgentState, MAX_MESSAGES
 
 # IMPORT ALL TOOLS (SQL + RAG)
 from beyond_capri.shared.mcp_server import get_account_balance, transfer_funds
 from beyond_capri.cloud_env.tools import search_knowledge_base
+from beyond_capri.cloud_env import prompts
+from beyond_capri.local_env.vector_store import open_index, namespace_for, IDENTITY_TYPE
+from beyond_capri.shared import telemetry, llm_client
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets for per-node prompt / completion sizes
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+def _without_messages(state: AgentState) -> dict:
+    """
+    Nodes hand back the whole state they were given; 'messages' has an appending
+    reducer, so returning it again would re-add every message at each node.
+    """
+    return {k: v for k, v in state.items() if k != "messages"}
+
+# Tools that only read; anything else (transfer_funds, unknown tools) changes state
+READ_ONLY_TOOLS = frozenset({"get_account_balance", "search_knowledge_base"})
 
 class A2AOrchestrator:
-    def __init__(self):
+    def __init__(self, llm=None, index=None):
+        """llm / index override the Groq chat model and the configured vector index."""
         # 1. Initialize Groq (High Intelligence)
-        self.llm = ChatGroq(
+        # Retries live in the shared LLM client, so the SDK's own are switched off
+        self.llm = llm or ChatGroq(
             temperature=0, 
             model_name="llama-3.3-70b-versatile",
-            api_key=Config.GROQ_API_KEY
+            api_key=Config.GROQ_API_KEY,
+            max_retries=0,
+            timeout=Config.LLM_TIMEOUT
         )
+        # The coordinator's plan is capped at generation time instead of being cut afterwards
+        self.planner = self.llm.bind(max_tokens=prompts.plan_max_tokens())
+        self.client = llm_client.get_client("groq")
+        # request_id -> callback receiving streamed final-answer text
+        self._token_sinks = {}
         
-        # 2. Initialize Pinecone
-        pc = Pinecone(api_key=Config.PINECONE_API_KEY)
-        self.index = pc.Index(Config.PINECONE_INDEX_NAME)
+        # 2. Initialize Vector Index (Pinecone or local backend)
+        self.index = index if index is not None else open_index()
+        self.identity_namespace = namespace_for(IDENTITY_TYPE)
         
         self.graph = self._build_graph()
 
-    def _fetch_cloud_anchor(self, text):
-        """Helper: Extracts Identity Anchors."""
+    def _fetch_cloud_anchor(self, text, known: dict = None):
+        """Helper: Extracts Identity Anchors. Ids already in `known` are not fetched again."""
         import re
-        uuids = re.findall(r"(Entity_)?[a-f0-9]{8}", text)
-        anchors = {}
-        print(f"[Coordinator] Querying Pinecone for UUIDs: {uuids}")
-        for uid in uuids:
-            clean_uid = uid if "Entity_" in uid else f"Entity_{uid}"
-            try:
-                response = self.index.fetch(ids=[clean_uid])
-                if clean_uid in response.vectors:
-                    context = response.vectors[clean_uid].metadata.get("semantic_context")
-                    anchors[clean_uid] = context
-            except Exception as e:
-                print(f"[Coordinator] Pinecone Error: {e}")
+        uuids = re.findall(r"(?:Entity_)?[a-f0-9]{8}", text)
+        clean_uids = list(dict.fromkeys(
+            uid if "Entity_" in uid else f"Entity_{uid}" for uid in uuids
+        ))
+        known = known or {}
+        anchors = {uid: known[uid] for uid in clean_uids if uid in known}
+        if anchors:
+            telemetry.increment("anchor_cache_hits_total", len(anchors))
+        clean_uids = [uid for uid in clean_uids if uid not in known]
+        if not clean_uids:
+            return anchors
+        logger.info(f"[Coordinator] Querying Pinecone for UUIDs: {clean_uids}")
+        try:
+            # One fetch for all candidates, scoped to the identity namespace
+            with telemetry.span("vector.fetch", namespace=self.identity_namespace, ids=len(clean_uids)):
+                response = self.index.fetch(ids=clean_uids, namespace=self.identity_namespace)
+            for uid, vec in response.vectors.items():
+                anchors[uid] = vec.metadata.get("semantic_context")
+        except Exception as e:
+            logger.error(f"[Coordinator] Pinecone Error: {e}")
         return anchors
 
+    def _invoke_llm(self, llm, messages, node: str, state: AgentState = None):
+        """
+        Every Groq call goes through the shared client (rate limit, retries) and is
+        timed per node. Identical prompts in flight for the same node share one call.
+        Token counts are recorded per node (in telemetry and in state['token_usage']).
+        """
+        key = (node, tuple(m.content for m in messages))
+        with telemetry.span("llm.groq.invoke", node=node) as span:
+            response = self.client.call(lambda: llm.invoke(messages), key=key, node=node)
+            usage = self._record_tokens(node, messages, response.content, response, state)
+            span.set(**usage)
+        return response
+
+    def _stream_llm(self, messages, node: str, on_token, state: AgentState = None) -> str:
+        """Streams a Groq answer chunk by chunk into on_token; returns the full text."""
+        parts = []
+        with telemetry.span("llm.groq.invoke", node=node, streamed=True) as span:
+            for chunk in self.client.stream(lambda: self.llm.stream(messages), node=node):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    on_token(chunk.content)
+            text = "".join(parts)
+            span.set(**self._record_tokens(node, messages, text, None, state))
+        return text
+
+    def _record_tokens(self, node: str, messages, output_text: str, response, state: AgentState) -> dict:
+        """Prefers the provider's usage report; falls back to counting locally."""
+        reported = getattr(response, "usage_metadata", None) or {}
+        usage = {
+            "input_tokens": reported.get("input_tokens") or sum(prompts.count_tokens(m.content) for m in messages),
+            "output_tokens": reported.get("output_tokens") or prompts.count_tokens(output_text),
+        }
+        telemetry.observe("prompt_tokens", usage["input_tokens"], buckets=TOKEN_BUCKETS, node=node)
+        telemetry.observe("completion_tokens", usage["output_tokens"], buckets=TOKEN_BUCKETS, node=node)
+        if state is not None:
+            state.setdefault('token_usage', {})[node] = usage
+        return usage
+
     # --- NODE 1: COORDINATOR ---
     def coordinator_node(self, state: AgentState):
+        with telemetry.request_context(state.get('request_id')), telemetry.span("orchestrator.coordinator"):
+            return _without_messages(self._coordinate(state))
+
+    def _coordinate(self, state: AgentState):
         user_msg = state['messages'][-1].content
-        anchors = self._fetch_cloud_anchor(user_msg)
-        state['semantic_anchors'] = anchors
-        
-        anchor_text = json.dumps(anchors, indent=2)
-        
-        prompt = f"""
-        You are the COORDINATOR of a Secure Banking AI.
+        known = state.get('semantic_anchors') or {}
+        anchors = self._fetch_cloud_anchor(user_msg, known)
+        # Keep the session's anchors too, so the caller can cache what was fetched
+        state['semantic_anchors'] = {**known, **anchors}
         
-        USER REQUEST: "{user_msg}"
-        IDENTITY CONTEXT: {anchor_text}
+        history = [
+            ("user" if isinstance(m, HumanMessage) else "assistant", m.content)
+            for m in state['messages'][:-1]
+        ]
+        # Compact, budgeted prompt (see prompts.py)
+        prompt = prompts.coordinator_prompt(user_msg, anchors, history)
         
-        Your Capabilities:
-        1. CHECK POLICIES: Use 'search_knowledge_base' if the request involves limits or rules.
-        2. CHECK FUNDS: Use 'get_account_balance'.
-        3. TRANSFER: Use 'transfer_funds'.
-        
-        Plan the steps for the Worker.
-        
-        PRIVACY RULE: The database uses generic names (John Doe). IGNORE name mismatches. TRUST THE UUIDs.
-        """
-        
-        response = self.llm.invoke([SystemMessage(content=prompt)])
+        response = self._invoke_llm(self.planner, [SystemMessage(content=prompt)], node="coordinator", state=state)
+        if (getattr(response, "response_metadata", None) or {}).get("finish_reason") == "length":
+            telemetry.increment("prompt_truncations_total", section="plan")
+            logger.warning(f"[Coordinator] Plan hit the {prompts.plan_max_tokens()}-token cap")
         state['current_instruction'] = response.content
-        print(f"\n[Coordinator Plan] {response.content}")
+        logger.info(f"[Coordinator Plan] {response.content}")
         return state
 
     # --- NODE 2: WORKER ---
     def worker_node(self, state: AgentState):
+        with telemetry.request_context(state.get('request_id')), telemetry.span("orchestrator.worker"):
+            return _without_messages(self._work(state))
+
+    def _work(self, state: AgentState):
         instruction = state['current_instruction']
         
         # Bind ALL tools
         tools = [get_account_balance, transfer_funds, search_knowledge_base]
         worker_llm = self.llm.bind_tools(tools)
         
-        prompt = f"""
-        You are the WORKER.
-        INSTRUCTION: "{instruction}"
-        
-        Execute the necessary tools.
-        If you see "John Doe" or "Jane Smith" in the tool output, IGNORE the name conflict.
-        Trust the UUID match.
-        """
+        prompt = prompts.worker_prompt(instruction)
         
         # 1. LLM decides tool call
-        response = worker_llm.invoke([HumanMessage(content=prompt)])
+        response = self._invoke_llm(worker_llm, [HumanMessage(content=prompt)], node="worker", state=state)
         
         # 2. Execution Loop
         if response.tool_calls:
@@ -101,21 +168,29 @@ class A2AOrchestrator:
             t_name = tool_call['name']
             t_args = tool_call['args']
             
-            print(f"[Worker] Calling Tool: {t_name}")
+            logger.info(f"[Worker] Calling Tool: {t_name}")
+            state.setdefault('tools_called', []).append(t_name)
             
-            if t_name == "get_account_balance":
-                res = get_account_balance.invoke(t_args)
-            elif t_name == "transfer_funds":
-                res = transfer_funds.invoke(t_args)
-            elif t_name == "search_knowledge_base":
-                res = search_knowledge_base.invoke(t_args)
-            else:
-                res = "Unknown Tool"
+            with telemetry.span(f"tool.{t_name}"):
+                if t_name == "get_account_balance":
+                    res = get_account_balance.invoke(t_args)
+                elif t_name == "transfer_funds":
+                    res = transfer_funds.invoke(t_args)
+                elif t_name == "search_knowledge_base":
+                    res = search_knowledge_base.invoke(t_args)
+                else:
+                    res = "Unknown Tool"
                 
             # 3. Final Answer
-            final_prompt = f"Tool Result: {res}. Write a confirmation message for the user."
-            final_response = self.llm.invoke([HumanMessage(content=final_prompt)])
-            state['final_response'] = final_response.content
+            final_prompt = prompts.final_prompt(res)
+            on_token = self._token_sinks.get(state.get('request_id'))
+            if on_token:
+                state['final_response'] = self._stream_llm([HumanMessage(content=final_prompt)], "final", on_token,
+                                                           state=state)
+            else:
+                final_response = self._invoke_llm(self.llm, [HumanMessage(content=final_prompt)], node="final",
+                                                  state=state)
+                state['final_response'] = final_response.content
         else:
             state['final_response'] = response.content
             
@@ -130,11 +205,30 @@ class A2AOrchestrator:
         workflow.add_edge("worker", END)
         return workflow.compile()
 
-    def run(self, safe_prompt: str):
-        initial_state = {
-            "messages": [HumanMessage(content=safe_prompt)],
-            "semantic_anchors": {},
-            "current_instruction": "",
-            "final_response": ""
-        }
-        return self.graph.invoke(initial_state)
\ No newline at end of file
+    def run(self, safe_prompt: str, request_id: str = None, on_token=None, anchors: dict = None,
+            history: list = None):
+        """
+        on_token(text), if given, receives the final answer as it streams in.
+        anchors ({Entity id: context}) are already-resolved identity anchors that
+        are not fetched again; history is [(role, text)] of earlier (pseudonymized) turns.
+        """
+        with telemetry.request_context(request_id) as rid, telemetry.span("orchestrator.run"):
+            past = [
+                HumanMessage(content=text) if role == "user" else AIMessage(content=text)
+                for role, text in (history or [])
+            ][-(MAX_MESSAGES - 1):]
+            initial_state = {
+                "messages": past + [HumanMessage(content=safe_prompt)],
+                "semantic_anchors": dict(anchors or {}),
+                "current_instruction": "",
+                "final_response": "",
+                "token_usage": {},
+                "tools_called": [],
+                "request_id": rid
+            }
+            if on_token:
+                self._token_sinks[rid] = on_token
+            try:
+                return self.graph.invoke(initial_state)
+            finally:
+                self._token_sinks.pop(rid, None)
\ No newline at end of file
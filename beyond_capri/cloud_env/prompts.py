@@ -0,0 +1,173 @@
+"""
+Prompt building for the cloud agents, with per-section token budgets.
+
+Every variable section (identity anchors, conversation history, coordinator
+plan, tool results, knowledge-base chunks) is serialized compactly and cut to
+its budget from Config.PROMPT_BUDGETS before it is placed into a template, so
+prompt size stays flat no matter how much context a request drags in.
+Truncation is deterministic (same input -> same prompt), which also keeps the
+LLM client's request coalescing effective.
+
+The user request is never cut: a request over its budget is rejected with a
+ValueError (check_request), since a silently shortened instruction could turn
+into a different one. The coordinator plan is bounded at generation time
+(max_tokens on the coordinator call), so the worker gets it whole. Every real
+cut of another section logs a warning and counts prompt_truncations_total
+{section=...}. The request and tool results keep their whitespace, since their
+symbols and line breaks can carry meaning; only the one-line-per-item sections
+(anchors, history) have it collapsed.
+
+Tokenizer: budgets are counted with tiktoken's cl100k_base (a requirement). The
+served model (Llama 3.3 on Groq) uses a 128k-token BPE whose first 100k merges
+are cl100k_base, so for English prompts the local count matches or slightly
+overestimates the real one, which is the safe side for a budget. The
+authoritative counts are the usage Groq reports per call, recorded by
+A2AOrchestrator._record_tokens. If the encoding can't be loaded (e.g. offline
+with an empty tiktoken cache), a chars/4 estimate is used and a warning logged.
+"""
+import math
+import logging
+import textwrap
+from config import Config
+from beyond_capri.shared import telemetry
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_ENCODING = "cl100k_base"
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding(TOKENIZER_ENCODING)
+except Exception as e:  # not installed, or the encoding file can't be fetched offline
+    logger.warning(f"[Prompts] tiktoken {TOKENIZER_ENCODING} unavailable ({e}); budgeting with chars/4")
+    _ENCODING = None
+
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARK = " …[truncated]"
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def truncate_tokens(text: str, budget: int, section: str = "other") -> str:
+    """Keeps the head of text within budget tokens, cutting on a word boundary."""
+    tokens = count_tokens(text)
+    if tokens <= budget:
+        return text
+    telemetry.increment("prompt_truncations_total", section=section)
+    logger.warning(f"[Prompts] {section} truncated from {tokens} to {budget} tokens")
+    if budget <= 0:
+        return ""
+    keep = max(budget - count_tokens(TRUNCATION_MARK), 1)
+    if _ENCODING is not None:
+        head = _ENCODING.decode(_ENCODING.encode(text)[:keep])
+    else:
+        head = text[:keep * CHARS_PER_TOKEN]
+    cut = head.rfind(" ")
+    if cut > len(head) // 2:
+        head = head[:cut]
+    return head.rstrip() + TRUNCATION_MARK
+
+def squeeze(text: str) -> str:
+    """Collapses runs of whitespace into one space (for one-line anchor / history entries)."""
+    return " ".join((text or "").split())
+
+def compact_anchors(anchors: dict, budget: int) -> str:
+    """
+    {'Entity_a1b2c3d4': 'Entity Type: PERSON, Context: Sender'} ->
+    'Entity_a1b2c3d4=PERSON; Sender', one per line, sorted by id. Anchors that
+    don't fit the budget are dropped whole (a half anchor is worse than none).
+    """
+    lines = []
+    used = 0
+    for uid in sorted(anchors):
+        context = anchors[uid] or ""
+        context = context.replace("Entity Type: ", "").replace(", Context: ", "; ")
+        line = f"{uid}={squeeze(context)}"
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            lines.append(f"(+{len(anchors) - len(lines)} more)")
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines) if lines else "none"
+
+def compact_history(history: list, budget: int) -> str:
+    """Newest turns first into the budget; rendered oldest first. history is [(role, text)]."""
+    kept = []
+    used = 0
+    for role, text in reversed(history):
+        line = f"{role.upper()}: {squeeze(text)}"
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(reversed(kept))
+
+def fit_chunks(chunks: list, budget: int, separator: str = "\n\n", section: str = "kb") -> str:
+    """Takes ranked chunks in order until the budget runs out; the last one may be cut."""
+    parts = []
+    remaining = budget
+    for chunk in chunks:
+        chunk = chunk.strip()
+        cost = count_tokens(chunk) + count_tokens(separator)
+        if cost <= remaining:
+            parts.append(chunk)
+            remaining -= cost
+            continue
+        if remaining > 20:
+            parts.append(truncate_tokens(chunk, remaining, section))
+        break
+    return separator.join(parts)
+
+COORDINATOR_TEMPLATE = textwrap.dedent("""\
+    You are the COORDINATOR of a Secure Banking AI.
+    {history}USER REQUEST: "{request}"
+    IDENTITY CONTEXT:
+    {anchors}
+    Tools: search_knowledge_base (limits, rules, policies), get_account_balance, transfer_funds.
+    Plan the steps for the Worker.
+    PRIVACY RULE: The database uses generic names (John Doe). IGNORE name mismatches. TRUST THE UUIDs.""")
+
+WORKER_TEMPLATE = textwrap.dedent("""\
+    You are the WORKER.
+    INSTRUCTION: "{instruction}"
+    Execute the necessary tools.
+    If you see "John Doe" or "Jane Smith" in the tool output, IGNORE the name conflict. Trust the UUID match.""")
+
+FINAL_TEMPLATE = "Tool Result: {result}. Write a confirmation message for the user."
+
+def _budget(section: str) -> int:
+    return Config.PROMPT_BUDGETS[section]
+
+def check_request(request: str) -> str:
+    """Returns request unchanged, or raises ValueError if it exceeds the request budget."""
+    tokens, budget = count_tokens(request), _budget("request")
+    if tokens > budget:
+        telemetry.increment("prompt_requests_rejected_total")
+        logger.warning(f"[Prompts] Request rejected: {tokens} tokens, budget {budget}")
+        raise ValueError(f"Request is too long ({tokens} tokens, limit {budget}); please shorten it")
+    return request
+
+def plan_max_tokens() -> int:
+    """Generation cap for the coordinator, so the plan fits the worker prompt whole."""
+    return _budget("plan")
+
+def coordinator_prompt(request: str, anchors: dict, history: list = None) -> str:
+    history_text = compact_history(history or [], _budget("history"))
+    return COORDINATOR_TEMPLATE.format(
+        history=f"CONVERSATION SO FAR:\n{history_text}\n" if history_text else "",
+        request=check_request(request),
+        anchors=compact_anchors(anchors, _budget("anchors")),
+    )
+
+def worker_prompt(instruction: str) -> str:
+    # Already bounded by plan_max_tokens() when it was generated
+    return WORKER_TEMPLATE.format(instruction=instruction)
+
+def final_prompt(tool_result) -> str:
+    return FINAL_TEMPLATE.format(result=truncate_tokens(str(tool_result), _budget("tool_result"), "tool_result"))
@@ -1,12 +1,18 @@
 from typing import TypedDict, Annotated, List, Dict, Any
-import operator
+
+# Messages kept in the graph state; older ones are dropped as new ones arrive
+MAX_MESSAGES = 12
+
+def add_recent(left: list, right: list) -> list:
+    """Reducer for 'messages': append, then keep only the newest MAX_MESSAGES."""
+    return (left + right)[-MAX_MESSAGES:]
 
 class AgentState(TypedDict):
     """
     The Global State shared between Coordinator and Worker.
     """
-    # The conversation history
-    messages: Annotated[List[Dict[str, Any]], operator.add]
+    # The conversation history (recent turns + the current request), bounded
+    messages: Annotated[List[Dict[str, Any]], add_recent]
     
     # The Secret Knowledge (Semantic Anchors)
     # The Coordinator fills this. The Worker reads it but ignores conflicts.
@@ -17,4 +23,13 @@ class AgentState(TypedDict):
     current_instruction: str
     
     # Final output to send back to local env
-    final_response: str
\ No newline at end of file
+    final_response: str
+
+    # Counted tokens per LLM call site: {'coordinator': {'input_tokens': 212, 'output_tokens': 64}}
+    token_usage: Dict[str, Dict[str, int]]
+
+    # Tools the Worker invoked, in order (callers decide whether a result may be replayed)
+    tools_called: List[str]
+
+    # Correlates telemetry spans across nodes for one request
+    request_id: str
\ No newline at end of file
@@ -1,12 +1,36 @@
+import logging
+import threading
 from langchain_core.tools import tool
-from pinecone import Pinecone
 from sentence_transformers import SentenceTransformer
+from beyond_capri.local_env.vector_store import open_index, as_values, namespace_for, DOCUMENT_TYPE
+from beyond_capri.shared import telemetry
+from beyond_capri.cloud_env.prompts import fit_chunks
 from config import Config
 
-# Initialize Cloud-Side Resources
-pc = Pinecone(api_key=Config.PINECONE_API_KEY)
-index = pc.Index(Config.PINECONE_INDEX_NAME)
-model = SentenceTransformer('all-MiniLM-L6-v2')
+logger = logging.getLogger(__name__)
+
+# Cloud-Side Resources (created on first use, or injected via configure())
+index = None
+model = None
+DOCUMENT_NAMESPACE = namespace_for(DOCUMENT_TYPE)
+_init_lock = threading.Lock()
+
+def configure(index_override=None, model_override=None):
+    """Swaps the index / embedding model used by the tools (e.g. offline stubs)."""
+    global index, model
+    if index_override is not None:
+        index = index_override
+    if model_override is not None:
+        model = model_override
+
+def _resources():
+    global index, model
+    with _init_lock:
+        if index is None:
+            index = open_index()
+        if model is None:
+            model = SentenceTransformer('all-MiniLM-L6-v2')
+    return index, model
 
 @tool
 def search_knowledge_base(query: str):
@@ -14,19 +38,23 @@ def search_knowledge_base(query: str):
     Searches the Cloud Knowledge Base (Document Policies).
     Use this to check transfer limits, account rules, or compliance policies.
     """
-    print(f"\n[Cloud Tool] Searching Knowledge Base for: '{query}'")
+    logger.info(f"[Cloud Tool] Searching Knowledge Base for: '{query}'")
     
+    index, model = _resources()
+
     # Embed query
-    vector = model.encode(query).tolist()
+    with telemetry.span("embed.encode", chars=len(query)):
+        vector = model.encode(query, normalize_embeddings=True, convert_to_numpy=True)
     
     try:
-        # Search Pinecone for 'document_knowledge' only
-        results = index.query(
-            vector=vector,
-            top_k=2,
-            include_metadata=True,
-            filter={"type": "document_knowledge"} 
-        )
+        # Search the document namespace only (identity anchors live elsewhere)
+        with telemetry.span("vector.query", namespace=DOCUMENT_NAMESPACE):
+            results = index.query(
+                vector=as_values(index, vector),
+                top_k=2,
+                include_metadata=True,
+                namespace=DOCUMENT_NAMESPACE
+            )
         
         # Extract text
         matches = [match['metadata']['original_text'] for match in results['matches']]
@@ -34,7 +62,9 @@ def search_knowledge_base(query: str):
         if not matches:
             return "No relevant policies found."
             
-        return "\n\n".join(matches)
+        # Ranked chunks, cut to the KB token budget
+        return fit_chunks(matches, Config.PROMPT_BUDGETS["kb"])
         
     except Exception as e:
+        telemetry.increment("tool_errors_total", tool="search_knowledge_base")
         return f"Search Error: {e}"
\ No newline at end of file
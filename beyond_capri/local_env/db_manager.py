@@ -1,11 +1,19 @@
 import sqlite3
 import json
+import time
+import logging
 from config import Config
+from beyond_capri.shared import telemetry
+from beyond_capri.local_env.vault_cache import VaultCache
+
+logger = logging.getLogger(__name__)
 
 class IdentityVault:
     def __init__(self, db_path=Config.DB_PATH):
         self.db_path = db_path
         self._init_db()
+        # Bloom filter + LRU shared by every vault instance on this file
+        self.cache = VaultCache.for_path(db_path)
 
     def _init_db(self):
         """Initialize the SQLite database with the identity_map table."""
@@ -15,9 +23,22 @@ class IdentityVault:
             CREATE TABLE IF NOT EXISTS identity_map (
                 uuid TEXT PRIMARY KEY,
                 original_pii TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                entity_type TEXT
             )
         ''')
+        
+        # Vaults created before retention existed lack entity_type: add and backfill it
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(identity_map)')]
+        if 'entity_type' not in columns:
+            logger.info("[Vault] Migrating identity_map: adding entity_type column...")
+            cursor.execute('ALTER TABLE identity_map ADD COLUMN entity_type TEXT')
+            cursor.execute("UPDATE identity_map SET entity_type = json_extract(original_pii, '$.type')")
+        
+        # Retention scans by age, overall and per type (see retention.py)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_identity_map_timestamp ON identity_map (timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_identity_map_type_timestamp '
+                       'ON identity_map (entity_type, timestamp)')
         conn.commit()
         conn.close()
 
@@ -25,39 +46,83 @@ class IdentityVault:
         """
         Save the mapping between a UUID and the real PII data.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Store PII as a JSON string
-        pii_json = json.dumps(pii_data)
-        
-        try:
-            cursor.execute('INSERT OR REPLACE INTO identity_map (uuid, original_pii) VALUES (?, ?)', 
-                           (uuid, pii_json))
-            conn.commit()
-            print(f"[Vault] Securely stored identity for UUID: {uuid}")
-        except Exception as e:
-            print(f"[Vault] Error saving identity: {e}")
-        finally:
-            conn.close()
+        self.save_identities([(uuid, pii_data)])
+
+    def save_identities(self, rows: list):
+        """
+        Save several (uuid, pii_data) mappings in one transaction.
+        Raises if the write fails (e.g. the vault stays locked past the timeout):
+        callers must not hand out pseudonyms that can't be resolved later.
+        """
+        with telemetry.span("sql.vault.save", rows=len(rows)):
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            # Store PII as a JSON string
+            params = [(uuid, json.dumps(pii_data), pii_data.get("type")) for uuid, pii_data in rows]
+            
+            try:
+                # Take the write lock explicitly so time spent waiting on other writers is visible
+                lock_start = time.perf_counter()
+                cursor.execute('BEGIN IMMEDIATE')
+                telemetry.observe("sqlite_lock_wait_seconds", time.perf_counter() - lock_start, db="vault")
+                cursor.executemany('INSERT OR REPLACE INTO identity_map (uuid, original_pii, entity_type) '
+                                   'VALUES (?, ?, ?)', params)
+                conn.commit()
+                self.cache.added(rows)
+                telemetry.increment("vault_writes_total", len(params))
+                for uuid, _, _ in params:
+                    logger.info(f"[Vault] Securely stored identity for UUID: {uuid}")
+            except Exception as e:
+                telemetry.increment("vault_errors_total", op="save")
+                if "locked" in str(e):
+                    telemetry.increment("sqlite_lock_timeouts_total", db="vault")
+                logger.error(f"[Vault] Error saving identity: {e}")
+                raise
+            finally:
+                conn.close()
 
     def get_real_identity(self, uuid: str) -> dict:
         """
         Retrieve the real PII data for a given UUID.
+        Recently resolved ids come from the LRU; ids the Bloom filter has never
+        seen are answered without a query.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT original_pii FROM identity_map WHERE uuid = ?', (uuid,))
-        result = cursor.fetchone()
-        conn.close()
+        cached = self.cache.get(uuid)
+        if cached is not None:
+            telemetry.increment("vault_lookups_total", result="cached")
+            return dict(cached)
+        if not self.cache.might_exist(uuid):
+            self.cache.record("filtered")
+            telemetry.increment("vault_lookups_total", result="filtered")
+            return None
+
+        with telemetry.span("sql.vault.get") as span:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT original_pii FROM identity_map WHERE uuid = ?', (uuid,))
+            result = cursor.fetchone()
+            conn.close()
+            span.set(found=result is not None)
 
+        telemetry.increment("vault_lookups_total", result="hit" if result else "miss")
         if result:
-            return json.loads(result[0])
+            self.cache.record("db_hits")
+            pii = json.loads(result[0])
+            self.cache.put(uuid, pii)
+            return dict(pii)
+        # The filter said "maybe" but the row isn't there
+        self.cache.record("false_positives")
         return None
 
+    def cache_stats(self) -> dict:
+        """Hit / miss / false-positive rates of the in-memory front (see vault_cache.py)."""
+        return self.cache.describe()
+
 # Simple test to run if file is executed directly
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     vault = IdentityVault()
     vault.save_identity("test-uuid-123", {"name": "Alice", "condition": "Flu"})
     print(vault.get_real_identity("test-uuid-123"))
\ No newline at end of file
@@ -1,58 +1,162 @@
 import uuid
 import json
+import logging
 import ollama
+from concurrent.futures import ThreadPoolExecutor
 from beyond_capri.local_env.db_manager import IdentityVault
 from beyond_capri.local_env.vector_store import AnchorStore
+from beyond_capri.local_env.session import ConversationSession, ENTITY_ID_PATTERN
+from beyond_capri.local_env import masking
+from beyond_capri.local_env.masking import MaskResult
+from config import Config
+from beyond_capri.shared import telemetry, llm_client
+
+logger = logging.getLogger(__name__)
 
 class Gatekeeper:
-    def __init__(self):
-        print("[Gatekeeper] Initializing Local Privacy Shield (Gemma 3 1B)...")
-        self.vault = IdentityVault()
-        self.anchor_store = AnchorStore()
+    def __init__(self, vault: IdentityVault = None, anchor_store: AnchorStore = None, chat_fn=None):
+        """
+        vault / anchor_store / chat_fn default to the real SQLite vault, vector
+        store and ollama chat; benchmarks inject offline stand-ins.
+        """
+        logger.info("[Gatekeeper] Initializing Local Privacy Shield (Gemma 3 1B)...")
+        self.vault = vault or IdentityVault()
+        self.anchor_store = anchor_store or AnchorStore()
+        self.chat_fn = chat_fn or ollama.Client(timeout=Config.LLM_TIMEOUT).chat
+        self.client = llm_client.get_client("ollama")
         self.model = "gemma3:1b"
 
-    def detect_and_sanitize(self, user_input: str):
+    def detect_and_sanitize(self, user_input: str, session: ConversationSession = None):
         """
         Main function: Takes raw text, hides PII, stores secrets, returns safe text.
+        With a session, entities from earlier turns keep their pseudonyms.
         """
+        return self.sanitize_with_offsets(user_input, session).text
+
+    def sanitize_with_offsets(self, user_input: str, session: ConversationSession = None) -> MaskResult:
+        """
+        Like detect_and_sanitize, but returns the MaskResult: the safe text plus
+        the OffsetMap between it and user_input (used by re-identification).
+        """
+        with telemetry.span("gatekeeper.sanitize", chars=len(user_input)):
+            return self._sanitize(user_input, session)
+
+    def _sanitize(self, user_input: str, session: ConversationSession = None) -> MaskResult:
+        # 0. Known entities keep their pseudonyms: no new vault row or anchor, and
+        #    the LLM only sees them already masked
+        text, known = user_input, {}
+        if session is not None:
+            text, known = session.pre_mask(user_input)
+
         # 1. Ask Local LLM to find PII and Context
-        print(f"[Gatekeeper] Scanning for PII in: '{user_input}'")
-        analysis = self._extract_pii_metadata(user_input)
+        logger.info(f"[Gatekeeper] Scanning for PII in: '{text}'")
+        analysis = self._extract_pii_metadata(text)
         
         if not analysis or "entities" not in analysis:
-            print("[Gatekeeper] No PII detected or analysis failed.")
-            return user_input
+            logger.info("[Gatekeeper] No PII detected or analysis failed.")
+            analysis = {"entities": []}
 
-        # 2. Process each entity
-        sanitized_text = user_input
-        
+        # 2. Mask known + new entities against the original text in one pass,
+        #    then persist vault rows and anchors in one go
+        vault_rows, anchors = [], []
+        result = self._mask(user_input, analysis, vault_rows, anchors, known)
+        self._persist(vault_rows, anchors)
+
+        # 3. Remember the new entities (and their anchors) for the next turns
+        if session is not None:
+            for safe_id, pii in vault_rows:
+                session.remember_entity(pii["original_text"], safe_id, pii["type"], pii["full_context"])
+            session.remember_anchors(dict(anchors))
+        return result
+
+    def detect_and_sanitize_batch(self, texts: list, max_workers: int = 4) -> list:
+        """
+        Sanitizes many texts at once (batch jobs). Identical texts share one LLM
+        extraction, extractions run concurrently, and all vault rows / anchors of
+        the batch are written in a single transaction / upsert. Every text still
+        gets its own pseudonyms, so separate requests stay unlinkable in the cloud.
+        """
+        with telemetry.span("gatekeeper.sanitize_batch", size=len(texts)):
+            unique = list(dict.fromkeys(texts))
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                analyses = dict(zip(unique, pool.map(self._extract_pii_metadata, unique)))
+
+            vault_rows, anchors = [], []
+            sanitized = []
+            for text in texts:
+                analysis = analyses[text]
+                if not analysis or "entities" not in analysis:
+                    sanitized.append(text)
+                else:
+                    sanitized.append(self._mask(text, analysis, vault_rows, anchors).text)
+
+            self._persist(vault_rows, anchors)
+            return sanitized
+
+    def _mask(self, text: str, analysis: dict, vault_rows: list, anchors: list,
+              known: dict = None) -> MaskResult:
+        """
+        Gives each newly detected entity a fresh pseudonym and masks every
+        occurrence of it (and of the `known` {original: pseudonym} entities) in
+        one pass; see masking.py. Collects what must be stored for entities that
+        actually got masked.
+        Fails closed: raises if any detected entity text survives in the safe text
+        (also in another case or spacing, see MaskResult.leaked).
+        """
+        # A. Generate a safe UUID per distinct new entity (e.g. Entity_a1b2c3d4)
+        fresh = {}
         for entity in analysis["entities"]:
             original_text = entity.get("text")
+            # Pseudonyms from earlier turns are not PII
+            if not original_text or original_text in fresh or original_text in (known or {}) \
+                    or ENTITY_ID_PATTERN.match(original_text):
+                continue
+            fresh[original_text] = (f"Entity_{str(uuid.uuid4())[:8]}", entity)
+
+        # B. Resolve overlapping matches (longest wins) and rewrite once
+        replacements = dict(known or {})
+        replacements.update({original: safe_id for original, (safe_id, _) in fresh.items()})
+        result = masking.mask(text, replacements)
+
+        # Nothing detected may reach the cloud unmasked (the PII itself stays out of the error)
+        leaked = result.leaked(replacements)
+        if leaked:
+            telemetry.increment("gatekeeper_leaks_blocked_total", len(leaked))
+            raise RuntimeError(f"[Gatekeeper] {len(leaked)} detected entit(y/ies) left unmasked; request blocked")
+
+        used = result.used()
+        for original_text, (safe_id, entity) in fresh.items():
+            if original_text not in used:
+                continue
             entity_type = entity.get("type")
             semantic_context = entity.get("context") # e.g. "Female patient with flu"
 
-            if original_text and original_text in sanitized_text:
-                # A. Generate a safe UUID
-                safe_id = f"Entity_{str(uuid.uuid4())[:8]}" # e.g. Entity_a1b2c3d4
-                
-                # B. Vault the Real Identity (Local Only)
-                self.vault.save_identity(safe_id, {
-                    "original_text": original_text,
-                    "type": entity_type,
-                    "full_context": semantic_context
-                })
-                
-                # C. Store Semantic Anchor (Cloud Pinecone)
-                # We store the "Meaning" but NOT the "Name"
-                # Logic: "Entity_x9 is a Female patient" (Safe to send to cloud)
-                anchor_text = f"Entity Type: {entity_type}, Context: {semantic_context}"
-                self.anchor_store.store_anchor(safe_id, anchor_text)
-                
-                # D. Replace in text
-                sanitized_text = sanitized_text.replace(original_text, safe_id)
-                print(f"   -> Masked '{original_text}' as '{safe_id}'")
-
-        return sanitized_text
+            # C. Vault the Real Identity (Local Only)
+            vault_rows.append((safe_id, {
+                "original_text": original_text,
+                "type": entity_type,
+                "full_context": semantic_context
+            }))
+
+            # D. Store Semantic Anchor (Cloud Pinecone)
+            # We store the "Meaning" but NOT the "Name"
+            # Logic: "Entity_x9 is a Female patient" (Safe to send to cloud)
+            anchor_text = f"Entity Type: {entity_type}, Context: {semantic_context}"
+            anchors.append((safe_id, anchor_text))
+
+            telemetry.increment("gatekeeper_entities_masked_total", type=str(entity_type))
+            logger.info(f"   -> Masked '{original_text}' as '{safe_id}'")
+
+        return result
+
+    def _persist(self, vault_rows: list, anchors: list):
+        # The vault write comes first and raises on failure, so an anchor never
+        # exists without its identity and no unresolvable pseudonym leaves the
+        # Gatekeeper (the request / batch group fails and can be retried)
+        if vault_rows:
+            self.vault.save_identities(vault_rows)
+        if anchors:
+            self.anchor_store.store_anchors(anchors)
 
     def _extract_pii_metadata(self, text: str):
         """
@@ -73,19 +177,26 @@ class Gatekeeper:
         }
         """
 
+        messages = [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': text}
+        ]
         try:
-            response = ollama.chat(model=self.model, messages=[
-                {'role': 'system', 'content': system_prompt},
-                {'role': 'user', 'content': text}
-            ], format='json') # Enforce JSON mode for reliability
+            # Concurrent requests with the same text share one extraction
+            with telemetry.span("llm.ollama.chat", model=self.model):
+                response = self.client.call(
+                    lambda: self.chat_fn(model=self.model, messages=messages, format='json'), # Enforce JSON mode for reliability
+                    key=(self.model, text)
+                )
 
             return json.loads(response['message']['content'])
         except Exception as e:
-            print(f"[Gatekeeper] LLM Extraction Error: {e}")
+            logger.error(f"[Gatekeeper] LLM Extraction Error: {e}")
             return None
 
 # Simple test block
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     gk = Gatekeeper()
     raw_text = "I need to send $50 to David Smith for the consultation."
     safe_text = gk.detect_and_sanitize(raw_text)
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import logging
+import numpy as np
+from beyond_capri.local_env.local_index import LocalVectorIndex
+
+logger = logging.getLogger(__name__)
+
+# Pinecone caps request payloads; the local index takes whole matrices
+PINECONE_BATCH = 200
+LOCAL_BATCH = 50000
+
+def _namespaces(index) -> list:
+    return sorted(index.describe_index_stats().namespaces.keys())
+
+def _read_namespace(index, namespace: str, batch_size: int):
+    """Pulls (ids, float32 matrix, metadata list) for one namespace of any index."""
+    if isinstance(index, LocalVectorIndex):
+        return index.export_arrays(namespace)
+
+    ids, vectors, metadata = [], [], []
+    for id_page in index.list(namespace=namespace, limit=batch_size):
+        if not id_page:
+            continue
+        fetched = index.fetch(ids=list(id_page), namespace=namespace).vectors
+        for vec_id, vec in fetched.items():
+            ids.append(vec_id)
+            vectors.append(vec.values)
+            metadata.append(dict(vec.metadata or {}))
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+    return ids, matrix, metadata
+
+def export_snapshot(index, path: str, namespaces: list = None, batch_size: int = PINECONE_BATCH,
+                    dtype: str = "float32"):
+    """
+    Copies ids, vectors and metadata out of an index (Pinecone or local).
+
+    - path ending in '.npz': one columnar file per snapshot ('<ns>/ids', '<ns>/vectors',
+      '<ns>/metadata'), convenient to ship around.
+    - anything else: a directory in the LocalVectorIndex on-disk layout, which the
+      local backend can memory-map directly at startup (LOCAL_INDEX_SNAPSHOT).
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"Snapshot target already exists: {path}")
+    start = time.perf_counter()
+    namespaces = namespaces if namespaces is not None else _namespaces(index)
+    total = 0
+
+    if path.endswith(".npz"):
+        arrays = {}
+        for namespace in namespaces:
+            ids, vectors, metadata = _read_namespace(index, namespace, batch_size)
+            arrays[f"{namespace}/ids"] = np.asarray(ids, dtype=str)
+            arrays[f"{namespace}/vectors"] = vectors
+            arrays[f"{namespace}/metadata"] = np.asarray([json.dumps(m) for m in metadata], dtype=str)
+            total += len(ids)
+            logger.info(f"[Snapshot] namespace '{namespace}': {len(ids)} vectors")
+        arrays["__namespaces__"] = np.asarray(namespaces, dtype=str)
+        # Stored uncompressed: vectors barely compress and loading stays a plain read
+        np.savez(path, **arrays)
+    else:
+        # The snapshot must take the source's width, not LocalVectorIndex's default
+        dimension = index.describe_index_stats().dimension
+        snapshot = LocalVectorIndex(path=path, dimension=dimension, dtype=dtype)
+        for namespace in namespaces:
+            ids, vectors, metadata = _read_namespace(index, namespace, batch_size)
+            if ids:
+                snapshot.upsert_arrays(ids, vectors, metadata, namespace=namespace)
+            total += len(ids)
+            logger.info(f"[Snapshot] namespace '{namespace}': {len(ids)} vectors")
+        snapshot.flush()
+
+    logger.info(f"[Snapshot] Exported {total} vectors to {path} in {time.perf_counter() - start:.1f}s")
+    return total
+
+def _iter_snapshot(path: str):
+    """Yields (namespace, ids, vectors, metadata) from either snapshot format."""
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            for namespace in data["__namespaces__"].tolist():
+                ids = data[f"{namespace}/ids"].tolist()
+                metadata = [json.loads(m) for m in data[f"{namespace}/metadata"].tolist()]
+                yield namespace, ids, data[f"{namespace}/vectors"], metadata
+    else:
+        snapshot = LocalVectorIndex(snapshot=path)
+        for namespace in sorted(snapshot.partitions):
+            ids, vectors, metadata = snapshot.export_arrays(namespace)
+            yield namespace, ids, vectors, metadata
+
+def import_snapshot(index, path: str, batch_size: int = None):
+    """
+    Bulk-loads a snapshot into an index. The local backend takes large matrix
+    batches; Pinecone gets request-sized pages of records.
+    """
+    start = time.perf_counter()
+    local = isinstance(index, LocalVectorIndex)
+    batch_size = batch_size or (LOCAL_BATCH if local else PINECONE_BATCH)
+    total = 0
+
+    for namespace, ids, vectors, metadata in _iter_snapshot(path):
+        for lo in range(0, len(ids), batch_size):
+            hi = min(lo + batch_size, len(ids))
+            if local:
+                index.upsert_arrays(ids[lo:hi], vectors[lo:hi], metadata[lo:hi], namespace=namespace)
+            else:
+                index.upsert(vectors=[
+                    {"id": ids[i], "values": vectors[i].tolist(), "metadata": metadata[i]}
+                    for i in range(lo, hi)
+                ], namespace=namespace)
+        total += len(ids)
+        logger.info(f"[Snapshot] namespace '{namespace}': {len(ids)} vectors")
+
+    if local:
+        index.flush()
+    logger.info(f"[Snapshot] Imported {total} vectors from {path} in {time.perf_counter() - start:.1f}s")
+    return total
@@ -1,4 +1,5 @@
 import os
+import logging
 import uuid
 from beyond_capri.local_env.gatekeeper import Gatekeeper
 from beyond_capri.local_env.vector_store import AnchorStore
@@ -47,7 +48,9 @@ def ingest_documents():
                     metadata={"source": filename, "chunk_index": i}
                 )
     
+    store.flush()
     print("\n=== INGESTION COMPLETE ===")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     ingest_documents()
\ No newline at end of file
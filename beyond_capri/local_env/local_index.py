@@ -0,0 +1,524 @@
+import os
+import json
+import atexit
+import shutil
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Supported storage formats for the similarity scan
+DTYPES = ("float32", "float16", "int8")
+
+# Rows scored per step, so int8/float16 codes are widened in bounded chunks
+SCAN_BLOCK = 65536
+
+DEFAULT_NAMESPACE_DIR = "__default__"
+
+class _Record:
+    """
+    Response object with both attribute and item access, like Pinecone's
+    (a dict subclass would shadow fields such as 'values').
+    """
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def __getitem__(self, name):
+        return self.__dict__[name]
+
+    def __setitem__(self, name, value):
+        self.__dict__[name] = value
+
+    def __contains__(self, name):
+        return name in self.__dict__
+
+    def get(self, name, default=None):
+        return self.__dict__.get(name, default)
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+    def __repr__(self):
+        return f"{self.__dict__}"
+
+def normalize(vectors) -> np.ndarray:
+    """L2-normalizes rows so a dot product equals cosine similarity."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def quantize(vectors: np.ndarray, dtype: str):
+    """
+    Encodes float32 rows into the storage dtype.
+    Returns (codes, scales); scales are per-vector and only differ from 1.0 for int8.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.ones(len(vectors), dtype=np.float32)
+    if dtype == "float32":
+        return vectors, scales
+    if dtype == "float16":
+        return vectors.astype(np.float16), scales
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unsupported index dtype: {dtype} (expected one of {DTYPES})")
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * scales[:, None]
+
+def _matches_filter(metadata: dict, flt: dict) -> bool:
+    """Subset of Pinecone metadata filters: equality, $eq, $ne, $in, $nin."""
+    for key, cond in flt.items():
+        value = metadata.get(key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$eq" and value != arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$nin" and value in arg:
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+class _Growable:
+    """Contiguous array with amortized appends (capacity doubles when full)."""
+    def __init__(self, data: np.ndarray):
+        self.data = data
+        self.size = len(data)
+
+    def append(self, rows: np.ndarray):
+        needed = self.size + len(rows)
+        if needed > len(self.data):
+            capacity = max(needed, 2 * len(self.data), 64)
+            grown = np.empty((capacity,) + self.data.shape[1:], dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = rows
+        self.size = needed
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+class _Segmented:
+    """
+    A read-mostly base array (a copy-on-write mmap of the saved file after a
+    load) plus an in-RAM tail for rows appended since. Appends never copy the
+    base, so the first upsert after startup doesn't pull a whole mapped file
+    into RAM; save() merges both into one file again.
+    """
+    def __init__(self, base: np.ndarray):
+        self.base = base
+        self.tail = _Growable(np.empty((0,) + base.shape[1:], dtype=base.dtype))
+
+    @property
+    def size(self) -> int:
+        return len(self.base) + self.tail.size
+
+    @property
+    def itemsize(self) -> int:
+        return self.base.itemsize
+
+    def append(self, rows: np.ndarray):
+        self.tail.append(rows)
+
+    def __getitem__(self, rows):
+        n = len(self.base)
+        if np.isscalar(rows):
+            return self.base[rows] if rows < n else self.tail.data[rows - n]
+        rows = np.asarray(rows)
+        in_base = rows < n
+        if in_base.all():
+            return self.base[rows]
+        out = np.empty((len(rows),) + self.base.shape[1:], dtype=self.base.dtype)
+        out[in_base] = self.base[rows[in_base]]
+        out[~in_base] = self.tail.data[rows[~in_base] - n]
+        return out
+
+    def __setitem__(self, row: int, value):
+        # In-place updates of base rows only dirty their own page of the private map
+        n = len(self.base)
+        if row < n:
+            self.base[row] = value
+        else:
+            self.tail.data[row - n] = value
+
+    def segments(self):
+        """(first row, array) per segment, without copying."""
+        yield 0, self.base
+        if self.tail.size:
+            yield len(self.base), self.tail.view()
+
+    def view(self) -> np.ndarray:
+        """All rows as one array; copies only when there is a tail."""
+        if not self.tail.size:
+            return self.base
+        return np.concatenate([self.base, self.tail.view()])
+
+    def select(self, keep: np.ndarray) -> np.ndarray:
+        """Rows where keep is True, as one in-RAM array."""
+        n = len(self.base)
+        return np.concatenate([self.base[keep[:n]], self.tail.view()[keep[n:]]])
+
+    def resident_bytes(self) -> int:
+        """Bytes held in RAM, i.e. excluding a mapped base (its pages are file-backed)."""
+        base = 0 if isinstance(self.base, np.memmap) else self.base.nbytes
+        return base + self.tail.size * self.tail.data[:1].nbytes
+
+class _Partition:
+    """
+    One namespace worth of vectors.
+    codes/scales are what the scan reads; 'full' keeps float32 rows for the exact
+    rerank and is only stored separately when the codes are quantized.
+    """
+    def __init__(self, dim: int, dtype: str):
+        self.dim = dim
+        self.dtype = dtype
+        self.ids = []
+        self.rows = {}
+        self.metadata = []
+        # alive is tiny and always in RAM; the others may be mapped from disk
+        self.alive = _Growable(np.empty(0, dtype=bool))
+        self.codes = _Segmented(np.empty((0, dim), dtype=np.dtype(dtype)))
+        self.scales = _Segmented(np.empty(0, dtype=np.float32))
+        self.full = None if dtype == "float32" else _Segmented(np.empty((0, dim), dtype=np.float32))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def upsert(self, ids: list, vectors: np.ndarray, metadatas: list):
+        # An id repeated within one call keeps its last vector (as Pinecone does);
+        # appending both would leave a live row no id points to
+        last = {vec_id: pos for pos, vec_id in enumerate(ids)}
+        if len(last) < len(ids):
+            keep = sorted(last.values())
+            ids = [ids[pos] for pos in keep]
+            vectors = np.asarray(vectors)[keep]
+            metadatas = [metadatas[pos] for pos in keep]
+        vectors = normalize(vectors)
+        codes, scales = quantize(vectors, self.dtype)
+
+        new_positions = []
+        for pos, (vec_id, meta) in enumerate(zip(ids, metadatas)):
+            row = self.rows.get(vec_id)
+            if row is None:
+                new_positions.append(pos)
+                continue
+            # Overwrite in place (copy-on-write mmaps make this safe after a load)
+            self.codes[row] = codes[pos]
+            self.scales[row] = scales[pos]
+            if self.full is not None:
+                self.full[row] = vectors[pos]
+            self.metadata[row] = meta
+
+        if new_positions:
+            start = self.codes.size
+            for offset, pos in enumerate(new_positions):
+                self.rows[ids[pos]] = start + offset
+                self.ids.append(ids[pos])
+                self.metadata.append(metadatas[pos])
+            self.codes.append(codes[new_positions])
+            self.scales.append(scales[new_positions])
+            self.alive.append(np.ones(len(new_positions), dtype=bool))
+            if self.full is not None:
+                self.full.append(vectors[new_positions])
+
+    def delete(self, ids: list):
+        for vec_id in ids:
+            row = self.rows.pop(vec_id, None)
+            if row is not None:
+                self.alive.data[row] = False
+                self.metadata[row] = None
+
+    def vector(self, row: int) -> np.ndarray:
+        if self.full is not None:
+            return np.asarray(self.full[row], dtype=np.float32)
+        return np.asarray(self.codes[row], dtype=np.float32)
+
+    def search(self, query: np.ndarray, top_k: int, flt: dict = None, rerank_factor: int = 4):
+        """Returns [(row, score)] best-first."""
+        n = self.codes.size
+        if n == 0 or top_k <= 0:
+            return []
+
+        # 1. Approximate scores over the (possibly quantized) codes, block by block
+        scores = np.empty(n, dtype=np.float32)
+        scales = self.scales.view()
+        for offset, codes in self.codes.segments():
+            for start in range(0, len(codes), SCAN_BLOCK):
+                block = np.asarray(codes[start:start + SCAN_BLOCK], dtype=np.float32)
+                rows = slice(offset + start, offset + start + len(block))
+                scores[rows] = (block @ query) * scales[rows]
+
+        # 2. Mask deleted and filtered-out rows
+        scores[~self.alive.view()] = -np.inf
+        if flt:
+            for row in np.flatnonzero(np.isfinite(scores)):
+                if not _matches_filter(self.metadata[row], flt):
+                    scores[row] = -np.inf
+
+        # 3. Shortlist, then exact rerank against float32 rows when quantized
+        shortlist = top_k * max(rerank_factor, 1) if self.full is not None else top_k
+        shortlist = min(shortlist, n)
+        candidates = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        candidates = candidates[np.isfinite(scores[candidates])]
+        if self.full is not None and len(candidates):
+            candidates = np.sort(candidates)  # sequential reads from the mmap
+            exact = np.asarray(self.full[candidates], dtype=np.float32) @ query
+            scores[candidates] = exact
+
+        best = candidates[np.argsort(-scores[candidates], kind="stable")][:top_k]
+        return [(int(row), float(scores[row])) for row in best]
+
+    def memory_bytes(self) -> dict:
+        """
+        Bytes of the scan arrays and of the float32 rerank copy (quantized
+        dtypes keep both, so 'total' is what the partition really stores), plus
+        how much of it is held in RAM rather than in file-backed mapped pages.
+        """
+        scan = self.codes.size * self.codes.itemsize * self.dim + self.scales.size * 4
+        rerank = self.full.size * 4 * self.dim if self.full is not None else 0
+        resident = self.codes.resident_bytes() + self.scales.resident_bytes() + self.alive.size
+        if self.full is not None:
+            resident += self.full.resident_bytes()
+        return {"scan": scan, "rerank": rerank, "total": scan + rerank, "resident": resident}
+
+    # --- Persistence ---
+    def save(self, path: str):
+        keep = self.alive.view().copy()
+        os.makedirs(path, exist_ok=True)
+        # Boolean indexing copies into RAM, which releases any mmap over the old files
+        arrays = {"codes": self.codes.select(keep), "scales": self.scales.select(keep)}
+        if self.full is not None:
+            arrays["full"] = self.full.select(keep)
+        ids = [vec_id for vec_id, ok in zip(self.ids, keep) if ok]
+        metadata = [meta for meta, ok in zip(self.metadata, keep) if ok]
+        self.codes = self.scales = self.full = None
+
+        for name, arr in arrays.items():
+            tmp = os.path.join(path, f"{name}.tmp.npy")
+            np.save(tmp, np.ascontiguousarray(arr))
+            os.replace(tmp, os.path.join(path, f"{name}.npy"))
+        tmp = os.path.join(path, "records.tmp.json")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "dim": self.dim, "ids": ids, "metadata": metadata}, f)
+        os.replace(tmp, os.path.join(path, "records.json"))
+
+        loaded = _Partition.load(path)
+        self.__dict__.update(loaded.__dict__)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(os.path.join(path, "records.json"), encoding="utf-8") as f:
+            records = json.load(f)
+        part = cls(records["dim"], records["dtype"])
+        part.ids = records["ids"]
+        part.metadata = records["metadata"]
+        part.rows = {vec_id: row for row, vec_id in enumerate(part.ids)}
+        # Copy-on-write maps: pages load lazily and in-place updates never touch the file
+        part.codes = _Segmented(np.load(os.path.join(path, "codes.npy"), mmap_mode="c"))
+        part.scales = _Segmented(np.load(os.path.join(path, "scales.npy"), mmap_mode="c"))
+        part.alive = _Growable(np.ones(len(part.ids), dtype=bool))
+        full_path = os.path.join(path, "full.npy")
+        if part.dtype != "float32" and os.path.exists(full_path):
+            part.full = _Segmented(np.load(full_path, mmap_mode="c"))
+        return part
+
+class LocalVectorIndex:
+    """
+    In-process replacement for a Pinecone Index (upsert/fetch/query/delete/list),
+    with one partition per namespace stored as contiguous NumPy arrays.
+    """
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str = None, dimension: int = 384, dtype: str = "float32", rerank_factor: int = 4,
+                 snapshot: str = None):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported index dtype: {dtype} (expected one of {DTYPES})")
+        self.path = path
+        self.dimension = dimension
+        self.dtype = dtype
+        self.rerank_factor = rerank_factor
+        self.partitions = {}
+        self._dirty = set()
+        self._lock = threading.RLock()
+        # Directory the current partitions were mapped from (None = built in memory)
+        self._source = None
+        if path and os.path.exists(os.path.join(path, "manifest.json")):
+            self._load(path)
+        elif snapshot and os.path.exists(os.path.join(snapshot, "manifest.json")):
+            # Warm start: map the snapshot read-only; the first flush writes to 'path'
+            self._load(snapshot)
+
+    @classmethod
+    def shared(cls, path: str, **kwargs):
+        """One instance per path per process, flushed to disk at exit."""
+        with cls._shared_lock:
+            if path not in cls._shared:
+                index = cls(path, **kwargs)
+                atexit.register(index.flush)
+                cls._shared[path] = index
+            return cls._shared[path]
+
+    def _partition(self, namespace: str, create: bool = False):
+        part = self.partitions.get(namespace)
+        if part is None and create:
+            part = self.partitions[namespace] = _Partition(self.dimension, self.dtype)
+        return part
+
+    # --- Pinecone-compatible API ---
+    def upsert(self, vectors: list, namespace: str = ""):
+        if not vectors:
+            return _Record(upserted_count=0)
+        if isinstance(vectors[0], dict):
+            ids = [v["id"] for v in vectors]
+            values = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+            metadatas = [dict(v.get("metadata") or {}) for v in vectors]
+        else:
+            ids = [v[0] for v in vectors]
+            values = np.asarray([v[1] for v in vectors], dtype=np.float32)
+            metadatas = [dict(v[2]) if len(v) > 2 and v[2] else {} for v in vectors]
+
+        with self._lock:
+            self._partition(namespace, create=True).upsert(ids, values, metadatas)
+            self._dirty.add(namespace)
+        return _Record(upserted_count=len(ids))
+
+    def upsert_arrays(self, ids: list, vectors: np.ndarray, metadatas: list = None, namespace: str = ""):
+        """Bulk upsert straight from a matrix, skipping the per-record dicts."""
+        if metadatas is None:
+            metadatas = [{} for _ in ids]
+        with self._lock:
+            self._partition(namespace, create=True).upsert(list(ids), np.asarray(vectors, dtype=np.float32), metadatas)
+            self._dirty.add(namespace)
+        return _Record(upserted_count=len(ids))
+
+    def export_arrays(self, namespace: str = ""):
+        """Returns (ids, float32 matrix, metadata list) for the live rows of a namespace."""
+        with self._lock:
+            part = self._partition(namespace)
+            if part is None or len(part) == 0:
+                return [], np.empty((0, self.dimension), dtype=np.float32), []
+            rows = np.flatnonzero(part.alive.view())
+            if part.full is not None:
+                vectors = np.asarray(part.full[rows], dtype=np.float32)
+            else:
+                vectors = np.asarray(part.codes[rows], dtype=np.float32)
+            return [part.ids[r] for r in rows], vectors, [part.metadata[r] for r in rows]
+
+    def fetch(self, ids: list, namespace: str = ""):
+        found = {}
+        with self._lock:
+            part = self._partition(namespace)
+            if part is not None:
+                for vec_id in ids:
+                    row = part.rows.get(vec_id)
+                    if row is not None:
+                        found[vec_id] = _Record(id=vec_id, values=part.vector(row), metadata=part.metadata[row])
+        return _Record(vectors=found, namespace=namespace)
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = False, include_values: bool = False,
+              filter: dict = None, namespace: str = ""):
+        query = normalize(vector)[0]
+        with self._lock:
+            part = self._partition(namespace)
+            hits = part.search(query, top_k, filter, self.rerank_factor) if part is not None else []
+            matches = []
+            for row, score in hits:
+                match = _Record(id=part.ids[row], score=score)
+                if include_metadata:
+                    match["metadata"] = part.metadata[row]
+                if include_values:
+                    match["values"] = part.vector(row)
+                matches.append(match)
+        return _Record(matches=matches, namespace=namespace)
+
+    def delete(self, ids: list = None, delete_all: bool = False, namespace: str = ""):
+        with self._lock:
+            if delete_all:
+                self.partitions.pop(namespace, None)
+            elif ids:
+                part = self._partition(namespace)
+                if part is not None:
+                    part.delete(ids)
+            self._dirty.add(namespace)
+        return _Record()
+
+    def list(self, prefix: str = None, limit: int = 100, namespace: str = ""):
+        """Yields pages of ids, like the serverless Pinecone list()."""
+        with self._lock:
+            part = self._partition(namespace)
+            ids = [vec_id for vec_id in part.rows] if part is not None else []
+        if prefix:
+            ids = [vec_id for vec_id in ids if vec_id.startswith(prefix)]
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def describe_index_stats(self):
+        with self._lock:
+            namespaces = {ns: _Record(vector_count=len(part)) for ns, part in self.partitions.items()}
+        return _Record(
+            dimension=self.dimension,
+            namespaces=namespaces,
+            total_vector_count=sum(ns.vector_count for ns in namespaces.values()),
+        )
+
+    def memory_usage(self) -> dict:
+        """Per-namespace bytes: scan arrays, float32 rerank copy, their total, and the RAM-resident part."""
+        with self._lock:
+            return {ns: part.memory_bytes() for ns, part in self.partitions.items()}
+
+    # --- Persistence ---
+    def _namespace_dir(self, namespace: str, root: str = None) -> str:
+        return os.path.join(root or self.path, namespace or DEFAULT_NAMESPACE_DIR)
+
+    def flush(self):
+        """Writes changed namespaces to disk and re-opens them memory-mapped."""
+        if not self.path:
+            return
+        with self._lock:
+            if self._source is not None and self._source != self.path:
+                # Mapped from a snapshot: every namespace must land in our own directory
+                self._dirty.update(self.partitions)
+            if not self._dirty:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            for namespace in self._dirty:
+                part = self.partitions.get(namespace)
+                if part is None or len(part) == 0:
+                    # Empty partitions are dropped rather than written as zero-length maps
+                    self.partitions.pop(namespace, None)
+                    shutil.rmtree(self._namespace_dir(namespace), ignore_errors=True)
+                else:
+                    part.save(self._namespace_dir(namespace))
+            manifest = {
+                "dimension": self.dimension,
+                "dtype": self.dtype,
+                "namespaces": sorted(self.partitions),
+            }
+            tmp = os.path.join(self.path, "manifest.tmp.json")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp, os.path.join(self.path, "manifest.json"))
+            self._dirty.clear()
+            self._source = self.path
+
+    def _load(self, root: str):
+        with open(os.path.join(root, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.dimension = manifest["dimension"]
+        if manifest["dtype"] != self.dtype:
+            logger.warning(f"[LocalIndex] Using on-disk dtype '{manifest['dtype']}' (configured '{self.dtype}')")
+            self.dtype = manifest["dtype"]
+        for namespace in manifest["namespaces"]:
+            self.partitions[namespace] = _Partition.load(self._namespace_dir(namespace, root))
+        self._source = root
+        logger.info(f"[LocalIndex] Loaded {sum(len(p) for p in self.partitions.values())} vectors from {root}")
@@ -0,0 +1,212 @@
+"""
+Span-based masking: find every occurrence of the detected entities on token
+boundaries, resolve overlaps (longest match wins, then leftmost), and rewrite
+the text in one pass.
+
+    result = mask(text, {"Sarah Jones": "Entity_1a2b3c4d", "Sarah": "Entity_5e6f7a8b"})
+    result.text      # masked text
+    result.offsets   # OffsetMap between the original and masked text
+
+Replacing entities one by one with str.replace rescans the whole text per
+entity and lets a short entity ("Sarah") bite into a longer one that was
+already masked or is about to be ("Sarah Jones"). Here every candidate span is
+collected against the original text first, so neither can happen.
+
+A match must start and end on a token boundary: next to a non-alphanumeric
+character, the text edge, or a letter/digit change. So 'Ali' does not match
+inside 'Alice' and 'Li' not inside 'Limit', while '12345' in 'ACC12345' and
+'Sarah' in 'Sarah123' are still masked.
+"""
+import re
+import bisect
+
+class Span:
+    __slots__ = ("start", "end", "original", "replacement")
+
+    def __init__(self, start: int, end: int, original: str, replacement: str):
+        self.start = start
+        self.end = end
+        self.original = original
+        self.replacement = replacement
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"Span({self.start}, {self.end}, {self.original!r} -> {self.replacement!r})"
+
+# Keys are indexed by their first PREFIX_LEN characters; shorter keys are scanned with str.find
+PREFIX_LEN = 3
+
+def _joined(a: str, b: str) -> bool:
+    """True if a and b belong to the same token (both letters or both digits)."""
+    return (a.isalpha() and b.isalpha()) or (a.isdigit() and b.isdigit())
+
+def _on_boundary(text: str, start: int, end: int) -> bool:
+    """True if text[start:end] neither starts nor ends inside a token."""
+    if start > 0 and _joined(text[start - 1], text[start]):
+        return False
+    return end == len(text) or not _joined(text[end - 1], text[end])
+
+def find_spans(text: str, replacements: dict) -> list:
+    """
+    Every occurrence of every key of replacements ({original: replacement}) in
+    text that sits on token boundaries, as Spans.
+
+    Keys are indexed by their first PREFIX_LEN characters and length. A regex
+    character class of the keys' first characters picks the candidate positions
+    (in C); each costs one dict lookup, plus one per distinct key length on a
+    prefix hit, so the cost grows with the text size, not with text size x
+    number of entities.
+    """
+    by_prefix = {}
+    short = []
+    for original, replacement in replacements.items():
+        if not original:
+            continue
+        if len(original) >= PREFIX_LEN:
+            by_prefix.setdefault(original[:PREFIX_LEN], {}).setdefault(len(original), {})[original] = replacement
+        else:
+            short.append((original, replacement))
+
+    spans = []
+    if by_prefix:
+        lookup = by_prefix.get
+        first_chars = re.compile("[" + "".join(sorted({re.escape(k[0]) for k in by_prefix})) + "]")
+        for candidate in first_chars.finditer(text):
+            pos = candidate.start()
+            by_length = lookup(text[pos:pos + PREFIX_LEN])
+            if not by_length:
+                continue
+            for size, keys in by_length.items():
+                end = pos + size
+                original = text[pos:end]
+                replacement = keys.get(original)
+                if replacement is not None and _on_boundary(text, pos, end):
+                    spans.append(Span(pos, end, original, replacement))
+
+    # Keys shorter than the prefix: plain scan
+    for original, replacement in short:
+        pos = text.find(original)
+        while pos != -1:
+            end = pos + len(original)
+            if _on_boundary(text, pos, end):
+                spans.append(Span(pos, end, original, replacement))
+            pos = text.find(original, pos + 1)
+    return spans
+
+def resolve_overlaps(spans: list, length: int) -> list:
+    """
+    Keeps a non-overlapping subset: longer spans claim their characters first,
+    then (among equal lengths) the leftmost. Claimed
+    characters are tracked in a bytearray, so each check is one C-level scan of
+    the span's own width.
+    """
+    occupied = bytearray(length)
+    kept = []
+    for span in sorted(spans, key=lambda s: (-len(s), s.start)):
+        if occupied.find(1, span.start, span.end) != -1:
+            continue
+        occupied[span.start:span.end] = b"\x01" * len(span)
+        kept.append(span)
+    kept.sort(key=lambda s: s.start)
+    return kept
+
+class OffsetMap:
+    """
+    Pairs each masked span with its position in both texts:
+    entries are (original_start, original_end, masked_start, masked_end, original, replacement).
+    """
+    def __init__(self, entries: list):
+        self.entries = entries
+        self._masked_starts = [e[2] for e in entries]
+
+    def pseudonyms(self) -> dict:
+        """{replacement: original} for every pseudonym used."""
+        return {e[5]: e[4] for e in self.entries}
+
+    def to_original(self, masked_pos: int) -> int:
+        """Maps a position in the masked text back to the original text."""
+        i = bisect.bisect_right(self._masked_starts, masked_pos) - 1
+        if i < 0:
+            return masked_pos
+        o_start, o_end, m_start, m_end = self.entries[i][:4]
+        if masked_pos < m_end:
+            return o_start
+        return masked_pos - m_end + o_end
+
+    def restore(self, masked_text: str) -> str:
+        """Inverse of the masking for this exact masked text, in one pass."""
+        parts = []
+        cursor = 0
+        for _, _, m_start, m_end, original, _ in self.entries:
+            parts.append(masked_text[cursor:m_start])
+            parts.append(original)
+            cursor = m_end
+        parts.append(masked_text[cursor:])
+        return "".join(parts)
+
+    def __len__(self):
+        return len(self.entries)
+
+def rewrite(text: str, spans: list):
+    """Applies sorted, non-overlapping spans in a single pass. Returns (text, OffsetMap)."""
+    parts = []
+    entries = []
+    cursor = 0
+    masked_len = 0
+    for span in spans:
+        gap = text[cursor:span.start]
+        parts.append(gap)
+        masked_len += len(gap)
+        parts.append(span.replacement)
+        entries.append((span.start, span.end, masked_len, masked_len + len(span.replacement),
+                        span.original, span.replacement))
+        masked_len += len(span.replacement)
+        cursor = span.end
+    parts.append(text[cursor:])
+    return "".join(parts), OffsetMap(entries)
+
+class MaskResult:
+    __slots__ = ("text", "spans", "offsets")
+
+    def __init__(self, text: str, spans: list, offsets: OffsetMap):
+        self.text = text
+        self.spans = spans
+        self.offsets = offsets
+
+    def used(self) -> set:
+        """Originals that were actually masked somewhere (not fully shadowed)."""
+        return {span.original for span in self.spans}
+
+    def leaked(self, originals) -> list:
+        """
+        Originals whose surface form is still in the unmasked parts of the text
+        in another spelling the exact-match pass skips: different case
+        ('SARAH JONES') or whitespace ('Sarah\\nJones'). The text between
+        pseudonyms is re-scanned on token boundaries after folding case and
+        collapsing whitespace; pseudonyms themselves are left out, so an entity
+        like '1a' does not match inside 'Entity_1a2b'.
+        """
+        gaps = []
+        cursor = 0
+        for _, _, m_start, m_end, _, _ in self.offsets.entries:
+            gaps.append(self.text[cursor:m_start])
+            cursor = m_end
+        gaps.append(self.text[cursor:])
+        residue = "\x00".join(_fold(gap) for gap in gaps)
+        forms = {}
+        for original in originals:
+            if original:
+                forms.setdefault(_fold(original), original)
+        return sorted({span.replacement for span in find_spans(residue, forms)})
+
+def _fold(text: str) -> str:
+    """Case- and whitespace-insensitive form for the leak re-scan."""
+    return " ".join(text.lower().split())
+
+def mask(text: str, replacements: dict) -> MaskResult:
+    """find_spans -> resolve_overlaps -> rewrite."""
+    spans = resolve_overlaps(find_spans(text, replacements), len(text))
+    masked, offsets = rewrite(text, spans)
+    return MaskResult(masked, spans, offsets)
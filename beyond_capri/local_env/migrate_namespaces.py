@@ -0,0 +1,59 @@
+import logging
+from beyond_capri.local_env.vector_store import AnchorStore, namespace_for, IDENTITY_TYPE, DOCUMENT_TYPE
+
+logger = logging.getLogger(__name__)
+
+# Pinecone caps fetch/upsert/delete payloads, so records move in pages
+BATCH_SIZE = 100
+
+def migrate_to_namespaces(source_namespace: str = "", batch_size: int = BATCH_SIZE, dry_run: bool = False):
+    """
+    Moves vectors written before namespace partitioning (all in the default
+    namespace) into the identity / document namespaces, routed by their
+    metadata 'type'. Records are copied first and only then deleted from the
+    source, so an interrupted run can simply be restarted.
+    """
+    logger.info("[Migration] Starting namespace migration" + (" (dry run)" if dry_run else ""))
+    store = AnchorStore()
+    index = store.index
+
+    targets = {
+        IDENTITY_TYPE: namespace_for(IDENTITY_TYPE),
+        DOCUMENT_TYPE: namespace_for(DOCUMENT_TYPE),
+    }
+    moved = {ns: 0 for ns in targets.values()}
+    skipped = 0
+
+    # 1. Page through every id in the source namespace
+    for id_page in index.list(namespace=source_namespace, limit=batch_size):
+        if not id_page:
+            continue
+        fetched = index.fetch(ids=list(id_page), namespace=source_namespace).vectors
+
+        # 2. Route each record by its metadata type
+        routed = {ns: [] for ns in targets.values()}
+        for vec_id, vec in fetched.items():
+            metadata = vec.metadata or {}
+            target = targets.get(metadata.get("type"))
+            if target is None or target == source_namespace:
+                skipped += 1
+                continue
+            routed[target].append({"id": vec_id, "values": vec.values, "metadata": metadata})
+
+        # 3. Copy, then delete from the source
+        for target, records in routed.items():
+            if not records:
+                continue
+            logger.info(f"[Migration] {len(records)} records -> namespace '{target}'")
+            moved[target] += len(records)
+            if dry_run:
+                continue
+            index.upsert(vectors=records, namespace=target)
+            index.delete(ids=[r["id"] for r in records], namespace=source_namespace)
+
+    logger.info(f"[Migration] Moved: {moved}, left in place: {skipped}" + (" (dry run)" if dry_run else ""))
+    return moved
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    migrate_to_namespaces()
@@ -0,0 +1,240 @@
+"""
+Retention for the identity vault: expire identity_map rows by age, per entity
+type, and delete the matching identity anchors from the vector store.
+
+    VAULT_TTL="PERSON=30d,ORG=180d,*=90d"   # '*' covers every other type; unset = keep forever
+
+Purging runs in small batches (each its own short write transaction, so the
+Gatekeeper is never blocked for long), either once via run_retention.py or
+periodically from a background thread (VaultRetention.start). Freed pages are
+returned to the OS with incremental vacuum once the vault has been converted
+(a one-time, blocking full VACUUM: python run_retention.py --enable-incremental-vacuum).
+"""
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+from config import Config
+from beyond_capri.local_env.db_manager import IdentityVault
+from beyond_capri.local_env.vector_store import open_index, namespace_for, is_local, IDENTITY_TYPE
+from beyond_capri.shared import telemetry
+
+logger = logging.getLogger(__name__)
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Pinecone accepts at most 1000 ids per delete
+ANCHOR_DELETE_BATCH = 1000
+
+def parse_ttls(spec: str) -> dict:
+    """
+    'PERSON=30d,*=90d' -> {'PERSON': 2592000, '*': 7776000}. A TTL of 0 means keep forever.
+    Raises ValueError naming the offending entry for anything else.
+    """
+    ttls = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        entity_type, sep, value = part.partition("=")
+        entity_type, value = entity_type.strip(), value.strip().lower()
+        unit = value[-1:] if value[-1:] in UNITS else "s"
+        number = value[:-1] if value[-1:] in UNITS else value
+        try:
+            seconds = float(number)
+        except ValueError:
+            seconds = -1
+        if not sep or not entity_type or seconds < 0 or not math.isfinite(seconds):
+            raise ValueError(f"Invalid VAULT_TTL entry {part!r}: expected TYPE=<number>[s|m|h|d], e.g. PERSON=30d")
+        ttls[entity_type] = int(seconds * UNITS[unit])
+    return ttls
+
+class VaultRetention:
+    def __init__(self, vault: IdentityVault = None, index=None, ttls: dict = None,
+                 batch_size: int = None, vacuum_pages: int = None):
+        self.vault = vault or IdentityVault()
+        self.index = index if index is not None else open_index()
+        self.identity_namespace = namespace_for(IDENTITY_TYPE)
+        self.ttls = ttls if ttls is not None else parse_ttls(Config.VAULT_TTL)
+        self.batch_size = batch_size or Config.VAULT_PURGE_BATCH
+        self.vacuum_pages = vacuum_pages or Config.VAULT_VACUUM_PAGES
+        self.totals = {"purged": 0, "anchors_deleted": 0, "batches": 0, "seconds": 0.0, "runs": 0}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.vault.db_path, timeout=30)
+        conn.execute('PRAGMA busy_timeout = 30000')
+        return conn
+
+    # --- PURGE ---
+    def _expiry_clauses(self):
+        """(WHERE clause, params) per TTL rule; '*' matches types without their own rule."""
+        clauses = []
+        named = [t for t in self.ttls if t != "*"]
+        for entity_type, ttl in self.ttls.items():
+            if ttl <= 0:
+                continue
+            cutoff = f"-{ttl} seconds"
+            if entity_type == "*":
+                placeholders = ",".join("?" * len(named))
+                type_filter = f"(entity_type IS NULL OR entity_type NOT IN ({placeholders}))" if named \
+                    else "1 = 1"
+                clauses.append((f"{type_filter} AND timestamp < datetime('now', ?)", named + [cutoff]))
+            else:
+                clauses.append(("entity_type = ? AND timestamp < datetime('now', ?)", [entity_type, cutoff]))
+        return clauses
+
+    def purge_expired(self, max_batches: int = None) -> dict:
+        """
+        Deletes expired rows batch by batch. Anchors go first: if the vector store
+        call fails, the batch's rows stay and are retried on the next run, so no
+        anchor is ever orphaned. Returns this run's counts.
+        """
+        run = {"purged": 0, "anchors_deleted": 0, "batches": 0}
+        start = time.perf_counter()
+        with telemetry.span("vault.retention.purge") as span:
+            for where, params in self._expiry_clauses():
+                while max_batches is None or run["batches"] < max_batches:
+                    conn = self._connect()
+                    try:
+                        rows = conn.execute(f'SELECT rowid, uuid FROM identity_map WHERE {where} LIMIT ?',
+                                            params + [self.batch_size]).fetchall()
+                        if not rows:
+                            break
+                        uuids = [uuid for _, uuid in rows]
+
+                        # 1. Anchors in the vector store
+                        self._delete_anchors(uuids)
+                        run["anchors_deleted"] += len(uuids)
+
+                        # 2. Vault rows, in one short write transaction
+                        conn.execute('BEGIN IMMEDIATE')
+                        conn.executemany('DELETE FROM identity_map WHERE rowid = ?', [(rowid,) for rowid, _ in rows])
+                        conn.commit()
+                    finally:
+                        conn.close()
+
+                    self.vault.cache.discard(uuids)
+                    run["purged"] += len(rows)
+                    run["batches"] += 1
+                    telemetry.increment("vault_rows_purged_total", len(rows))
+            span.set(**run)
+
+        if run["anchors_deleted"] and is_local(self.index):
+            self.index.flush()
+
+        elapsed = time.perf_counter() - start
+        for key, value in run.items():
+            self.totals[key] += value
+        self.totals["seconds"] += elapsed
+        self.totals["runs"] += 1
+        run["seconds"] = elapsed
+        run["rows_per_s"] = run["purged"] / elapsed if elapsed else 0.0
+        if run["purged"]:
+            logger.info(f"[Retention] Purged {run['purged']} expired identities in {elapsed:.2f}s")
+        return run
+
+    def _delete_anchors(self, uuids: list):
+        for offset in range(0, len(uuids), ANCHOR_DELETE_BATCH):
+            with telemetry.span("vector.delete", namespace=self.identity_namespace):
+                self.index.delete(ids=uuids[offset:offset + ANCHOR_DELETE_BATCH], namespace=self.identity_namespace)
+
+    # --- VACUUM ---
+    def incremental_vacuum_enabled(self) -> bool:
+        conn = self._connect()
+        try:
+            return conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        finally:
+            conn.close()
+
+    def ensure_incremental_vacuum(self):
+        """
+        auto_vacuum=INCREMENTAL only takes effect after a full VACUUM, so an
+        existing vault is converted once (this rewrites the file and blocks
+        every writer meanwhile; run_retention.py only does it on request).
+        """
+        conn = self._connect()
+        try:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                logger.info("[Retention] Enabling incremental vacuum on the vault (one-time VACUUM)...")
+                conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                conn.execute('VACUUM')
+        finally:
+            conn.close()
+
+    def incremental_vacuum(self, pages: int = None) -> int:
+        """Returns up to `pages` free pages to the OS; returns how many were freed."""
+        conn = self._connect()
+        try:
+            before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            # The pragma frees one page per step and Python's execute() steps it only
+            # once; executescript() runs it to completion
+            conn.executescript(f'PRAGMA incremental_vacuum({int(pages or self.vacuum_pages)});')
+            freed = before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+        finally:
+            conn.close()
+        telemetry.increment("vault_pages_vacuumed_total", freed)
+        return freed
+
+    # --- STATS ---
+    def stats(self) -> dict:
+        conn = self._connect()
+        try:
+            rows, oldest = conn.execute('SELECT COUNT(*), MIN(timestamp) FROM identity_map').fetchone()
+            by_type = dict(conn.execute(
+                "SELECT COALESCE(entity_type, '?'), COUNT(*) FROM identity_map GROUP BY entity_type"
+            ).fetchall())
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+            freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        finally:
+            conn.close()
+        wal_path = self.vault.db_path + "-wal"
+        return {
+            "rows": rows,
+            "rows_by_type": by_type,
+            "oldest": oldest,
+            "db_bytes": page_size * page_count,
+            "free_bytes": page_size * freelist,
+            "wal_bytes": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            "ttls": self.ttls,
+            "purge": {
+                **self.totals,
+                "rows_per_s": self.totals["purged"] / self.totals["seconds"] if self.totals["seconds"] else 0.0,
+            },
+        }
+
+    # --- BACKGROUND ---
+    def run_once(self) -> dict:
+        run = self.purge_expired()
+        # Without auto_vacuum=INCREMENTAL the pragma is a no-op; freed pages are reused by SQLite
+        run["pages_freed"] = self.incremental_vacuum() if self.incremental_vacuum_enabled() else 0
+        return run
+
+    def start(self, interval: float = None):
+        """Purges + vacuums every `interval` seconds on a daemon thread."""
+        if self._thread is not None or not self.ttls:
+            return
+        interval = interval or Config.VAULT_PURGE_INTERVAL_S
+        if not self.incremental_vacuum_enabled():
+            logger.info("[Retention] Incremental vacuum unavailable on this vault; purged pages stay in the "
+                        "file for reuse (enable once with: python run_retention.py --enable-incremental-vacuum)")
+
+        def loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    telemetry.increment("vault_retention_errors_total")
+                    logger.error(f"[Retention] Purge failed: {e}")
+                self._stop_event.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="vault-retention", daemon=True)
+        self._thread.start()
+        logger.info(f"[Retention] Background purge every {interval:.0f}s, TTLs: {self.ttls}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
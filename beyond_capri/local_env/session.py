@@ -0,0 +1,115 @@
+import re
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from beyond_capri.local_env import masking
+
+logger = logging.getLogger(__name__)
+
+ENTITY_ID_PATTERN = re.compile(r"^Entity_[a-f0-9]{8}$")
+
+class ConversationSession:
+    """
+    Carries what one conversation has already learned across turns:
+
+      * entities: original text -> pseudonym (+ type / context), so a name seen in
+        an earlier turn keeps its Entity id and is masked without a new vault row
+        or anchor upsert,
+      * anchors:  Entity id -> semantic context, so the coordinator only fetches
+        ids it has not seen yet,
+      * turns:    the last few (safe prompt, cloud response) pairs, pseudonymized
+        only, replayed to the cloud as a compact conversation summary.
+
+    Everything is bounded; the least recently used entities / anchors are evicted
+    first and only the most recent max_turns turns are kept.
+    """
+    def __init__(self, session_id: str = None, max_entities: int = 256, max_anchors: int = 256,
+                 max_turns: int = 6, max_turn_chars: int = 300):
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.max_entities = max_entities
+        self.max_anchors = max_anchors
+        self.max_turn_chars = max_turn_chars
+        self.entities = OrderedDict()
+        self.anchors = OrderedDict()
+        self.turns = deque(maxlen=max_turns)
+        self.stats = {"entity_hits": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    # --- ENTITIES ---
+    def remember_entity(self, original_text: str, safe_id: str, entity_type: str = None, context: str = None):
+        with self._lock:
+            self.entities[original_text] = {"safe_id": safe_id, "type": entity_type, "context": context}
+            self.entities.move_to_end(original_text)
+            while len(self.entities) > self.max_entities:
+                _, entry = self.entities.popitem(last=False)
+                self.anchors.pop(entry["safe_id"], None)
+                self.stats["evictions"] += 1
+                logger.info(f"[Session] Evicted entity '{entry['safe_id']}'")
+
+    def pre_mask(self, text: str):
+        """
+        Masks entities already known to this session with their pseudonyms
+        (longest match wins, so 'Sarah Jones' beats 'Sarah').
+        Returns (masked_text, {original: pseudonym} for the entities found).
+        """
+        with self._lock:
+            candidates = {o: e["safe_id"] for o, e in self.entities.items() if o in text}
+            result = masking.mask(text, candidates)
+            used = {o: candidates[o] for o in result.used()}
+            for original in used:
+                self.entities.move_to_end(original)
+            self.stats["entity_hits"] += len(used)
+        if used:
+            logger.info(f"[Session] Re-used {len(used)} known pseudonym(s): {list(used.values())}")
+        return result.text, used
+
+    # --- ANCHORS ---
+    def remember_anchors(self, anchors: dict):
+        with self._lock:
+            for safe_id, context in anchors.items():
+                if context is None:
+                    continue
+                self.anchors[safe_id] = context
+                self.anchors.move_to_end(safe_id)
+            while len(self.anchors) > self.max_anchors:
+                self.anchors.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def cached_anchors(self) -> dict:
+        with self._lock:
+            return dict(self.anchors)
+
+    # --- HISTORY ---
+    def add_turn(self, safe_prompt: str, cloud_response: str):
+        """Stores one turn, pseudonymized (this is what the cloud sees next turn)."""
+        with self._lock:
+            self.turns.append((self._clip(safe_prompt), self._clip(cloud_response)))
+
+    def history(self) -> list:
+        """[(role, text)] for the recent turns, oldest first."""
+        with self._lock:
+            pairs = list(self.turns)
+        history = []
+        for user_text, assistant_text in pairs:
+            history.append(("user", user_text))
+            history.append(("assistant", assistant_text))
+        return history
+
+    def summary(self) -> str:
+        """Compact one-line-per-message rendering of history()."""
+        return "\n".join(f"{role.upper()}: {text}" for role, text in self.history())
+
+    def _clip(self, text: str) -> str:
+        text = " ".join((text or "").split())
+        return text if len(text) <= self.max_turn_chars else text[:self.max_turn_chars - 3] + "..."
+
+    def describe(self) -> dict:
+        with self._lock:
+            return {
+                "session_id": self.session_id,
+                "entities": len(self.entities),
+                "anchors": len(self.anchors),
+                "turns": len(self.turns),
+                **self.stats,
+            }
@@ -0,0 +1,186 @@
+"""
+In-memory front for the identity vault:
+
+  * a Bloom filter of every pseudonym in identity_map, so lookups for ids that
+    were never issued (hashes, transaction refs, hex-looking numbers in cloud
+    output) are answered without touching SQLite,
+  * a bounded LRU of recently resolved identities, so hot ids skip SQLite too.
+
+One VaultCache is shared per database file (see VaultCache.for_path). It is
+built from identity_map on first use, updated by every save through
+IdentityVault, and caught up with rows written by other processes at most every
+Config.VAULT_BLOOM_SYNC_S seconds (on a negative answer), so a filter can only
+be stale for that long.
+"""
+import math
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Fixed-size Bloom filter; k bit positions per key via double hashing of one blake2b digest."""
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.fp_rate = fp_rate
+        self.num_bits = max(int(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+class VaultCache:
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path: str, lru_size: int = 4096, fp_rate: float = 0.01, sync_interval: float = 1.0):
+        self.db_path = db_path
+        self.lru_size = lru_size
+        self.fp_rate = fp_rate
+        self.sync_interval = sync_interval
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._max_rowid = 0
+        self._last_sync = 0.0
+        self.stats = {"lookups": 0, "lru_hits": 0, "filtered": 0, "db_hits": 0, "false_positives": 0}
+
+    @classmethod
+    def for_path(cls, db_path: str) -> "VaultCache":
+        """The process-wide cache for one vault file."""
+        with cls._shared_lock:
+            cache = cls._shared.get(db_path)
+            if cache is None:
+                cache = cls._shared[db_path] = cls(
+                    db_path,
+                    lru_size=Config.VAULT_CACHE_SIZE,
+                    fp_rate=Config.VAULT_BLOOM_FP_RATE,
+                    sync_interval=Config.VAULT_BLOOM_SYNC_S,
+                )
+            return cache
+
+    # --- BLOOM FILTER ---
+    def rebuild(self):
+        """(Re)builds the filter from identity_map, sized for twice the current row count."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            count, max_rowid = conn.execute('SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM identity_map').fetchone()
+            bloom = BloomFilter(max(2 * count, Config.VAULT_BLOOM_MIN_CAPACITY), self.fp_rate)
+            for (uuid,) in conn.execute('SELECT uuid FROM identity_map WHERE rowid <= ?', (max_rowid,)):
+                bloom.add(uuid)
+        finally:
+            conn.close()
+        with self._lock:
+            self._bloom = bloom
+            self._max_rowid = max_rowid
+            self._last_sync = time.monotonic()
+        logger.info(f"[Vault] Bloom filter built: {count} ids, {bloom.memory_bytes() / 1024:.0f} KiB")
+
+    def _sync(self):
+        """Adds rows other processes inserted since the last look (rowids only grow)."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute('SELECT rowid, uuid FROM identity_map WHERE rowid > ?', (self._max_rowid,)).fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            for rowid, uuid in rows:
+                self._bloom.add(uuid)
+                self._max_rowid = max(self._max_rowid, rowid)
+            self._last_sync = time.monotonic()
+            full = self._bloom.count > self._bloom.capacity
+        if full:
+            self.rebuild()
+
+    def might_exist(self, uuid: str) -> bool:
+        """False means the id is definitely not in the vault."""
+        if self._bloom is None:
+            self.rebuild()
+        if uuid in self._bloom:
+            return True
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self._sync()
+            return uuid in self._bloom
+        return False
+
+    def added(self, rows: list):
+        """Called after (uuid, pii) rows were committed."""
+        if self._bloom is None:
+            self.rebuild()
+            return
+        with self._lock:
+            for uuid, pii in rows:
+                self._bloom.add(uuid)
+                if uuid in self._lru:
+                    self._lru[uuid] = pii
+            full = self._bloom.count > self._bloom.capacity
+        if full:
+            self.rebuild()
+
+    def discard(self, uuids):
+        """Forgets deleted ids in the LRU (the filter just reports them as false positives)."""
+        with self._lock:
+            for uuid in uuids:
+                self._lru.pop(uuid, None)
+
+    # --- LRU ---
+    def get(self, uuid: str):
+        with self._lock:
+            self.stats["lookups"] += 1
+            pii = self._lru.get(uuid)
+            if pii is not None:
+                self._lru.move_to_end(uuid)
+                self.stats["lru_hits"] += 1
+            return pii
+
+    def put(self, uuid: str, pii: dict):
+        with self._lock:
+            self._lru[uuid] = pii
+            self._lru.move_to_end(uuid)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def record(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def describe(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            bloom = self._bloom
+            lru_entries = len(self._lru)
+        lookups = stats["lookups"] or 1
+        probed = stats["db_hits"] + stats["false_positives"]
+        return {
+            **stats,
+            "lru_entries": lru_entries,
+            "bloom_ids": bloom.count if bloom else 0,
+            "bloom_bytes": bloom.memory_bytes() if bloom else 0,
+            "hit_rate": (stats["lru_hits"] + stats["db_hits"]) / lookups,
+            "lru_hit_rate": stats["lru_hits"] / lookups,
+            "miss_rate": (stats["filtered"] + stats["false_positives"]) / lookups,
+            # Share of SQLite probes the filter let through for ids that don't exist
+            "false_positive_rate": stats["false_positives"] / probed if probed else 0.0,
+            "sqlite_avoided_rate": (stats["lru_hits"] + stats["filtered"]) / lookups,
+        }
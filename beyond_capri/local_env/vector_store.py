@@ -1,27 +1,89 @@
 import time
+import logging
 from pinecone import Pinecone, ServerlessSpec
 from sentence_transformers import SentenceTransformer
 from config import Config
+from beyond_capri.local_env.local_index import LocalVectorIndex
+from beyond_capri.shared import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Metadata 'type' value -> namespace holding that kind of vector
+IDENTITY_TYPE = "identity"
+DOCUMENT_TYPE = "document_knowledge"
+
+def namespace_for(kind: str, tenant: str = None) -> str:
+    """
+    Returns the namespace for a kind of vector ('identity' or 'document_knowledge'),
+    prefixed with the tenant when one is configured (e.g. 'acme-identities').
+    """
+    base = {
+        IDENTITY_TYPE: Config.IDENTITY_NAMESPACE,
+        DOCUMENT_TYPE: Config.DOCUMENT_NAMESPACE,
+    }.get(kind)
+    if base is None:
+        raise ValueError(f"Unknown vector kind: {kind}")
+
+    tenant = Config.PINECONE_TENANT if tenant is None else tenant
+    return f"{tenant}-{base}" if tenant else base
+
+def open_index():
+    """
+    Returns the configured vector index: the shared on-disk LocalVectorIndex
+    or a Pinecone Index handle. Both expose upsert/fetch/query/delete/list.
+    """
+    if Config.VECTOR_BACKEND == "local":
+        return LocalVectorIndex.shared(
+            Config.LOCAL_INDEX_DIR,
+            dtype=Config.LOCAL_INDEX_DTYPE,
+            rerank_factor=Config.LOCAL_INDEX_RERANK,
+            snapshot=Config.LOCAL_INDEX_SNAPSHOT
+        )
+    pc = Pinecone(api_key=Config.PINECONE_API_KEY)
+    return pc.Index(Config.PINECONE_INDEX_NAME)
+
+def is_local(index) -> bool:
+    """True for LocalVectorIndex and wrappers around it (duck-typed on its bulk API)."""
+    return hasattr(index, "upsert_arrays")
+
+def as_values(index, vector):
+    """
+    Embeddings stay float32 NumPy arrays; only the Pinecone wire format needs a list.
+    """
+    if is_local(index):
+        return vector
+    return vector.tolist()
 
 class AnchorStore:
-    def __init__(self):
-        # Initialize Pinecone Client
-        self.pc = Pinecone(api_key=Config.PINECONE_API_KEY)
+    def __init__(self, model=None, index=None):
+        """model / index override the MiniLM encoder and the configured index."""
         self.index_name = Config.PINECONE_INDEX_NAME
         
         # Initialize Local Embedding Model
-        print("[Pinecone] Loading embedding model (all-MiniLM-L6-v2)...")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        if model is None:
+            logger.info("[Pinecone] Loading embedding model (all-MiniLM-L6-v2)...")
+            model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model = model
         
-        self._ensure_index_exists()
-        self.index = self.pc.Index(self.index_name)
+        if index is not None:
+            self.index = index
+        elif Config.VECTOR_BACKEND == "local":
+            self.index = open_index()
+        else:
+            # Initialize Pinecone Client
+            self.pc = Pinecone(api_key=Config.PINECONE_API_KEY)
+            self._ensure_index_exists()
+            self.index = self.pc.Index(self.index_name)
+
+        self.identity_namespace = namespace_for(IDENTITY_TYPE)
+        self.document_namespace = namespace_for(DOCUMENT_TYPE)
 
     def _ensure_index_exists(self):
         """Check if index exists, if not create it (Serverless)."""
         existing_indexes = [i.name for i in self.pc.list_indexes()]
         
         if self.index_name not in existing_indexes:
-            print(f"[Pinecone] Index '{self.index_name}' not found. Creating...")
+            logger.info(f"[Pinecone] Index '{self.index_name}' not found. Creating...")
             try:
                 self.pc.create_index(
                     name=self.index_name,
@@ -31,57 +93,102 @@ class AnchorStore:
                 )
                 while not self.pc.describe_index(self.index_name).status['ready']:
                     time.sleep(1)
-                print(f"[Pinecone] Index '{self.index_name}' created successfully.")
+                logger.info(f"[Pinecone] Index '{self.index_name}' created successfully.")
             except Exception as e:
-                print(f"[Pinecone] Error creating index: {e}")
+                logger.error(f"[Pinecone] Error creating index: {e}")
         else:
-            print(f"[Pinecone] Connected to existing index: '{self.index_name}'")
+            logger.info(f"[Pinecone] Connected to existing index: '{self.index_name}'")
+
+    def flush(self):
+        """Persists pending writes (local backend only; Pinecone writes are immediate)."""
+        if is_local(self.index):
+            self.index.flush()
+
+    def embed(self, text: str):
+        """Encodes text as a normalized float32 NumPy vector."""
+        with telemetry.span("embed.encode", chars=len(text)):
+            return self.model.encode(text, normalize_embeddings=True, convert_to_numpy=True)
 
     def store_anchor(self, uuid: str, semantic_text: str):
         """Stores Identity Anchors (e.g., 'User_x9 is Female')"""
-        vector = self.model.encode(semantic_text).tolist()
+        vector = self.embed(semantic_text)
         try:
-            self.index.upsert(
-                vectors=[{
-                    "id": uuid,
-                    "values": vector,
-                    "metadata": {"semantic_context": semantic_text, "type": "identity"}
-                }]
-            )
-            print(f"[Pinecone] Identity Anchor stored for UUID: {uuid}")
+            with telemetry.span("vector.upsert", namespace=self.identity_namespace):
+                self.index.upsert(
+                    vectors=[{
+                        "id": uuid,
+                        "values": as_values(self.index, vector),
+                        "metadata": {"semantic_context": semantic_text, "type": IDENTITY_TYPE}
+                    }],
+                    namespace=self.identity_namespace
+                )
+            logger.info(f"[Pinecone] Identity Anchor stored for UUID: {uuid}")
         except Exception as e:
-            print(f"[Pinecone] Error upserting anchor: {e}")
+            logger.error(f"[Pinecone] Error upserting anchor: {e}")
+
+    def store_anchors(self, anchors: list, batch_size: int = 100):
+        """Stores several (uuid, semantic_text) anchors with one encode pass and batched upserts."""
+        if not anchors:
+            return
+        with telemetry.span("embed.encode", texts=len(anchors)):
+            vectors = self.model.encode([text for _, text in anchors], normalize_embeddings=True,
+                                        convert_to_numpy=True)
+        for start in range(0, len(anchors), batch_size):
+            batch = anchors[start:start + batch_size]
+            try:
+                with telemetry.span("vector.upsert", namespace=self.identity_namespace, vectors=len(batch)):
+                    self.index.upsert(
+                        vectors=[{
+                            "id": uuid,
+                            "values": as_values(self.index, vectors[start + i]),
+                            "metadata": {"semantic_context": text, "type": IDENTITY_TYPE}
+                        } for i, (uuid, text) in enumerate(batch)],
+                        namespace=self.identity_namespace
+                    )
+                logger.info(f"[Pinecone] {len(batch)} Identity Anchors stored.")
+            except Exception as e:
+                logger.error(f"[Pinecone] Error upserting anchors: {e}")
 
     def fetch_anchor(self, uuid: str):
         """Used to retrieve Identity Context"""
+        return self.fetch_anchors([uuid]).get(uuid)
+
+    def fetch_anchors(self, uuids: list) -> dict:
+        """Fetches several Identity Anchors in one round trip. Returns {uuid: context}."""
+        if not uuids:
+            return {}
         try:
-            result = self.index.fetch(ids=[uuid])
-            if uuid in result.vectors:
-                return result.vectors[uuid].metadata.get("semantic_context")
-            return None
+            with telemetry.span("vector.fetch", namespace=self.identity_namespace, ids=len(uuids)):
+                result = self.index.fetch(ids=list(uuids), namespace=self.identity_namespace)
+            return {
+                uid: vec.metadata.get("semantic_context")
+                for uid, vec in result.vectors.items()
+            }
         except Exception as e:
-            print(f"[Pinecone] Fetch error: {e}")
-            return None
+            logger.error(f"[Pinecone] Fetch error: {e}")
+            return {}
 
     # --- NEW RAG CAPABILITIES ---
     def store_document_chunk(self, doc_id: str, clean_text: str, metadata: dict):
         """
         Uploads a SANITIZED document chunk to Cloud Pinecone for RAG.
         """
-        vector = self.model.encode(clean_text).tolist()
+        vector = self.embed(clean_text)
         
         # Mark as 'document_knowledge' so we don't confuse it with people
-        metadata["type"] = "document_knowledge"
+        metadata["type"] = DOCUMENT_TYPE
         metadata["original_text"] = clean_text 
         
         try:
-            self.index.upsert(
-                vectors=[{
-                    "id": doc_id,
-                    "values": vector,
-                    "metadata": metadata
-                }]
-            )
-            print(f"[Pinecone] Document chunk '{doc_id}' stored successfully.")
+            with telemetry.span("vector.upsert", namespace=self.document_namespace):
+                self.index.upsert(
+                    vectors=[{
+                        "id": doc_id,
+                        "values": as_values(self.index, vector),
+                        "metadata": metadata
+                    }],
+                    namespace=self.document_namespace
+                )
+            logger.info(f"[Pinecone] Document chunk '{doc_id}' stored successfully.")
         except Exception as e:
-            print(f"[Pinecone] Document upload error: {e}")
\ No newline at end of file
+            logger.error(f"[Pinecone] Document upload error: {e}")
\ No newline at end of file
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from beyond_capri.shared.pipeline import process_request
+from beyond_capri.shared import telemetry
+
+logger = logging.getLogger(__name__)
+
+def load_records(input_path: str) -> list:
+    """Reads {"id": ..., "prompt": ...} lines; records without an id are keyed by line number."""
+    records = []
+    with open(input_path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            records.append({"id": str(record.get("id", line_no)), "prompt": record["prompt"]})
+    return records
+
+def completed_ids(output_path: str) -> set:
+    """
+    The output file doubles as the checkpoint: a record is done once its latest
+    line has status "ok". Failed records (rate limits, timeouts, ...) run again
+    and their new line supersedes the error line, so readers of the output keep
+    the last line per id. A torn last line (crash mid-write) is ignored and that
+    record reruns.
+    """
+    latest = {}
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                latest[str(record["id"])] = record.get("status")
+            except (ValueError, KeyError, TypeError):
+                continue
+    return {record_id for record_id, status in latest.items() if status == "ok"}
+
+def run_batch(input_path: str, output_path: str, concurrency: int = 8, group_size: int = 32,
+              gatekeeper=None, orchestrator=None, vault=None) -> dict:
+    """
+    Pushes a JSONL file of prompts through the privacy pipeline.
+
+    Prompts are processed in groups: the Gatekeeper sanitizes a whole group in
+    one call (shared LLM extractions, one vault transaction, one anchor upsert),
+    then orchestration + re-identification run with at most `concurrency`
+    requests in flight. Each result is appended to output_path as soon as it is
+    done, so rerunning after a crash skips everything already written.
+    """
+    if gatekeeper is None:
+        from beyond_capri.local_env.gatekeeper import Gatekeeper
+        gatekeeper = Gatekeeper()
+    if orchestrator is None:
+        from beyond_capri.cloud_env.a2a_orchestrator import A2AOrchestrator
+        orchestrator = A2AOrchestrator()
+    vault = vault or gatekeeper.vault
+
+    # 1. Skip what a previous run already finished
+    records = load_records(input_path)
+    done = completed_ids(output_path)
+    pending = [r for r in records if r["id"] not in done]
+    logger.info(f"[Batch] {len(records)} records, {len(done)} already done, {len(pending)} to run")
+
+    stats = {"total": len(records), "skipped": len(records) - len(pending), "ok": 0, "error": 0}
+    start = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for offset in range(0, len(pending), group_size):
+            group = pending[offset:offset + group_size]
+
+            # 2. Sanitize the whole group at once
+            group_start = time.perf_counter()
+            try:
+                safe_prompts = gatekeeper.detect_and_sanitize_batch(
+                    [r["prompt"] for r in group], max_workers=concurrency
+                )
+                sanitize_error = None
+            except Exception as e:
+                safe_prompts = [None] * len(group)
+                sanitize_error = f"sanitize: {e}"
+            # Per-record share of the grouped sanitization
+            sanitize_seconds = (time.perf_counter() - group_start) / len(group)
+
+            # 3. Orchestrate + re-identify concurrently
+            def one(record, safe_prompt):
+                if sanitize_error:
+                    raise RuntimeError(sanitize_error)
+                return process_request(gatekeeper, orchestrator, vault, record["prompt"],
+                                       safe_prompt=safe_prompt)
+
+            futures = [pool.submit(one, r, sp) for r, sp in zip(group, safe_prompts)]
+
+            # 4. Stream results in input order; flush so the checkpoint survives a crash
+            for record, future in zip(group, futures):
+                line = {"id": record["id"]}
+                try:
+                    result = future.result()
+                    line.update({
+                        "status": "ok",
+                        "request_id": result["request_id"],
+                        "safe_prompt": result["safe_prompt"],
+                        "final_response": result["final_response"],
+                        "timings": dict(result["timings"], sanitize=sanitize_seconds),
+                        "token_usage": result["token_usage"],
+                    })
+                    stats["ok"] += 1
+                except Exception as e:
+                    line.update({"status": "error", "error": str(e)})
+                    stats["error"] += 1
+                    telemetry.increment("batch_errors_total")
+                    logger.error(f"[Batch] Record {record['id']} failed: {e}")
+                out.write(json.dumps(line) + "\n")
+                out.flush()
+
+            logger.info(f"[Batch] {stats['ok'] + stats['error']}/{len(pending)} records processed")
+
+    stats["elapsed_s"] = time.perf_counter() - start
+    logger.info(f"[Batch] Done: {stats}")
+    return stats
@@ -0,0 +1,180 @@
+"""
+Background execution for interactive front ends (app.py).
+
+    runner = JobRunner(gatekeeper, orchestrator, vault)
+    job = runner.submit("Transfer $2000 ...", session=session)
+    job.snapshot()   # {"status": "running", "phases": ["sanitize"], "partial": "...", ...}
+
+Requests run on a small thread pool, so the UI script only submits and polls.
+Each Job records the phases finished so far, the intermediate texts and the
+final answer as it streams in. A prompt that is already in flight is joined
+rather than run twice.
+
+Finished results can be replayed (use_cache=True) from a bounded LRU keyed by
+(session id, normalized input), but only for runs that made no side-effecting
+tool call: a repeated "transfer $X to Y" must run transfer_funds again, never
+answer "transfer completed" from memory. A side-effecting run also drops the
+session's cached answers, since balances and the like may have changed.
+Replayed jobs are flagged `cached`.
+"""
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from beyond_capri.shared.pipeline import process_request, PHASES
+from beyond_capri.cloud_env.a2a_orchestrator import READ_ONLY_TOOLS
+from beyond_capri.shared import telemetry
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    def __init__(self, user_input: str, key: tuple):
+        self.job_id = uuid.uuid4().hex[:8]
+        self.input = user_input
+        self.key = key
+        self.status = "queued"      # queued -> running -> done | error
+        self.phases = []
+        self.result = {}
+        self.partial = ""
+        self.error = None
+        self.cached = False
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    # --- CALLBACKS (worker thread) ---
+    def on_phase(self, phase: str, result: dict):
+        with self._lock:
+            self.status = "running"
+            self.phases.append(phase)
+            self.result = dict(result)
+
+    def on_token(self, text: str):
+        with self._lock:
+            self.partial += text
+
+    def finish(self, result: dict = None, error: str = None):
+        with self._lock:
+            if result is not None:
+                self.result = dict(result)
+                self.phases = list(PHASES)
+            self.error = error
+            self.status = "error" if error else "done"
+            self.finished_at = time.time()
+
+    # --- READ (UI thread) ---
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "error")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "job_id": self.job_id,
+                "input": self.input,
+                "status": self.status,
+                "phases": list(self.phases),
+                "result": dict(self.result),
+                "partial": self.partial,
+                "error": self.error,
+                "cached": self.cached,
+                "elapsed_s": end - self.submitted_at,
+            }
+
+class JobRunner:
+    def __init__(self, gatekeeper, orchestrator, vault, max_workers: int = 4,
+                 cache_size: int = 128, max_jobs: int = 256):
+        self.gatekeeper = gatekeeper
+        self.orchestrator = orchestrator
+        self.vault = vault
+        self.cache_size = cache_size
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-job")
+        self._jobs = OrderedDict()
+        self._results = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(user_input: str, session=None) -> tuple:
+        return (session.session_id if session is not None else None, " ".join(user_input.split()))
+
+    def submit(self, user_input: str, session=None, use_cache: bool = False, profile: bool = None) -> Job:
+        key = self.cache_key(user_input, session)
+        with self._lock:
+            # 1. Same prompt already running: share its job
+            running = self._in_flight.get(key)
+            if running is not None:
+                telemetry.increment("ui_jobs_coalesced_total")
+                return running
+
+            job = Job(user_input, key)
+            self._remember(job)
+
+            # 2. Answered before by a read-only run: replay it
+            cached = self._results.get(key) if use_cache else None
+            if cached is not None:
+                self._results.move_to_end(key)
+                job.cached = True
+                job.partial = cached.get("cloud_response", "")
+                job.finish(cached)
+                telemetry.increment("ui_result_cache_hits_total")
+                return job
+
+            self._in_flight[key] = job
+
+        # 3. Otherwise run it in the background
+        self._pool.submit(self._run, job, session, profile)
+        telemetry.increment("ui_jobs_submitted_total")
+        return job
+
+    def _run(self, job: Job, session, profile: bool = None):
+        try:
+            result = process_request(self.gatekeeper, self.orchestrator, self.vault, job.input,
+                                     request_id=job.job_id, on_phase=job.on_phase,
+                                     session=session, on_token=job.on_token, profile=profile)
+            job.finish(result)
+            with self._lock:
+                if all(tool in READ_ONLY_TOOLS for tool in result.get("tools_called", [])):
+                    self._results[job.key] = result
+                    self._results.move_to_end(job.key)
+                    while len(self._results) > self.cache_size:
+                        self._results.popitem(last=False)
+                else:
+                    self._forget(job.key[0])
+        except Exception as e:
+            telemetry.increment("ui_job_errors_total")
+            logger.error(f"[Jobs] Job {job.job_id} failed: {e}")
+            job.finish(error=str(e))
+        finally:
+            with self._lock:
+                if self._in_flight.get(job.key) is job:
+                    del self._in_flight[job.key]
+
+    def _remember(self, job: Job):
+        """Keeps the newest max_jobs jobs; finished ones are dropped first."""
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.max_jobs:
+            oldest = next((j for j in self._jobs.values() if j.finished), None)
+            if oldest is None:
+                break
+            del self._jobs[oldest.job_id]
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def forget_session(self, session):
+        """Drops cached results of a conversation that was reset."""
+        with self._lock:
+            self._forget(session.session_id)
+
+    def _forget(self, session_id):
+        for key in [k for k in self._results if k[0] == session_id]:
+            del self._results[key]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
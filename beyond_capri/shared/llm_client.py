@@ -0,0 +1,212 @@
+"""
+Shared client layer for every LLM call (Groq in the cloud, Ollama locally).
+
+    groq = llm_client.get_client("groq")
+    response = groq.call(lambda: llm.invoke(messages), key=("coordinator", prompt), node="coordinator")
+
+Per provider it enforces:
+  * a concurrency cap (semaphore) so bursts queue instead of piling onto the API,
+  * a token-bucket rate limit matched to the provider's requests-per-minute quota,
+  * retries with full-jitter exponential backoff on rate limits (429, honouring
+    Retry-After), 5xx responses, timeouts and connection errors,
+  * single-flight coalescing: identical in-flight calls (same key) share one
+    upstream request instead of each paying for it,
+  * stream(), which yields chunks while holding the same slot and rate budget.
+
+Request timeouts are set on the transports themselves (ChatGroq / ollama.Client),
+see Config.LLM_TIMEOUT.
+"""
+import time
+import random
+import logging
+import threading
+from concurrent.futures import Future
+from config import Config
+from beyond_capri.shared import telemetry
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: rate limited, or the provider is having a bad moment
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Exception class-name fragments that mean a transient transport problem
+RETRYABLE_NAMES = ("RateLimit", "Timeout", "Connection", "ConnectError", "ReadError", "Overloaded")
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, at most `capacity` saved up."""
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Takes one token, sleeping until one is available. Returns seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return waited
+                delay = (1.0 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+def status_code(exc: Exception):
+    """HTTP status of a provider error (groq / ollama / httpx), if it carries one."""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+def is_retryable(exc: Exception) -> bool:
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return any(fragment in type(exc).__name__ for fragment in RETRYABLE_NAMES)
+
+def retry_after(exc: Exception):
+    """Seconds from a Retry-After header, when the provider sent one."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+class LLMClient:
+    def __init__(self, provider: str, max_concurrency: int = 4, requests_per_minute: float = 0,
+                 burst: int = 1, max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 20.0):
+        self.provider = provider
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._slots = threading.BoundedSemaphore(max(max_concurrency, 1))
+        self._bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def call(self, fn, key=None, **labels):
+        """
+        Runs fn() under this provider's limits and retry policy. Calls sharing a
+        (hashable) key while one is in flight wait for that result instead.
+        """
+        if key is None:
+            return self._call_with_retries(fn, labels)
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            telemetry.increment("llm_coalesced_total", provider=self.provider, **labels)
+            return future.result()
+
+        try:
+            result = self._call_with_retries(fn, labels)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def stream(self, fn, **labels):
+        """
+        Yields the chunks of fn() (an iterator-returning call such as
+        llm.stream(messages)). Retries only happen before the first chunk; once
+        output has been handed out, a failure is raised to the caller.
+        """
+        for attempt in range(self.max_retries + 1):
+            started = False
+            self._acquire(labels)
+            try:
+                with telemetry.span(f"llm.{self.provider}.stream", attempt=attempt, **labels) as span:
+                    call_start = time.perf_counter()
+                    for chunk in fn():
+                        if not started:
+                            started = True
+                            span.set(first_chunk_s=time.perf_counter() - call_start)
+                        yield chunk
+                telemetry.increment("llm_calls_total", provider=self.provider, **labels)
+                return
+            except Exception as e:
+                if started or not self._should_retry(e, attempt, labels):
+                    raise
+                error = e
+            finally:
+                self._slots.release()
+            self._backoff(error, attempt)
+
+    def _call_with_retries(self, fn, labels: dict):
+        for attempt in range(self.max_retries + 1):
+            self._acquire(labels)
+            try:
+                with telemetry.span(f"llm.{self.provider}.call", attempt=attempt, **labels):
+                    result = fn()
+                telemetry.increment("llm_calls_total", provider=self.provider, **labels)
+                return result
+            except Exception as e:
+                if not self._should_retry(e, attempt, labels):
+                    raise
+                error = e
+            finally:
+                # Never hold a slot while backing off
+                self._slots.release()
+            self._backoff(error, attempt)
+
+    def _acquire(self, labels: dict):
+        # Rate budget first: a throttled call must not sit on a slot that a call
+        # holding a token could use
+        throttled = self._bucket.acquire()
+        start = time.perf_counter()
+        self._slots.acquire()
+        queued = time.perf_counter() - start
+        telemetry.observe("llm_queue_wait_seconds", queued + throttled, provider=self.provider)
+
+    def _should_retry(self, exc: Exception, attempt: int, labels: dict) -> bool:
+        if attempt < self.max_retries and is_retryable(exc):
+            telemetry.increment("llm_retries_total", provider=self.provider, status=str(status_code(exc)))
+            logger.warning(f"[LLM] {self.provider} call failed ({type(exc).__name__}), retry {attempt + 1}/{self.max_retries}")
+            return True
+        telemetry.increment("llm_errors_total", provider=self.provider, **labels)
+        return False
+
+    def _backoff(self, exc: Exception, attempt: int):
+        # Full jitter keeps a burst of rate-limited callers from retrying in lockstep
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        delay = max(delay, retry_after(exc) or 0.0)
+        telemetry.observe("llm_backoff_seconds", delay, provider=self.provider)
+        time.sleep(delay)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(provider: str) -> LLMClient:
+    """One shared client per provider, so limits hold across every caller in the process."""
+    with _clients_lock:
+        client = _clients.get(provider)
+        if client is None:
+            client = _clients[provider] = LLMClient(
+                provider,
+                max_concurrency=Config.LLM_LIMITS.get(provider, {}).get("concurrency", 4),
+                requests_per_minute=Config.LLM_LIMITS.get(provider, {}).get("rpm", 0),
+                burst=Config.LLM_LIMITS.get(provider, {}).get("burst", 1),
+                max_retries=Config.LLM_MAX_RETRIES,
+                backoff_base=Config.LLM_BACKOFF_BASE,
+            )
+        return client
+
+def configure(provider: str, **kwargs) -> LLMClient:
+    """Replaces a provider's shared client (tests / benchmarks tune the limits)."""
+    with _clients_lock:
+        client = _clients[provider] = LLMClient(provider, **kwargs)
+        return client
@@ -1,6 +1,10 @@
 import sqlite3
 import os
+import logging
 from langchain_core.tools import tool
+from beyond_capri.shared import telemetry
+
+logger = logging.getLogger(__name__)
 
 # Path to the Real Financial Database
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "local_env", "financial_data.db")
@@ -15,7 +19,7 @@ def init_financial_db():
     # Seed with dummy data if empty
     c.execute("SELECT count(*) FROM accounts")
     if c.fetchone()[0] == 0:
-        print("[MCP DB] Seeding database with initial records...")
+        logger.info("[MCP DB] Seeding database with initial records...")
         # We purposely use "John Doe" (Generic Names) to test the agent's robustness
         data = [
             ('Entity_sender', 'John Doe', 'Premium', 5000.0, 'USD', 'Active'),
@@ -34,21 +38,22 @@ def get_account_balance(account_id: str):
     Retrieves balance and account details from the REAL SQL DB.
     Input: account_id (str)
     """
-    print(f"\n[MCP SQL] Querying balance for: {account_id}")
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row # Allows accessing columns by name
-    c = conn.cursor()
-    
-    c.execute("SELECT * FROM accounts WHERE id=?", (account_id,))
-    row = c.fetchone()
-    conn.close()
+    logger.info(f"[MCP SQL] Querying balance for: {account_id}")
+    with telemetry.span("sql.accounts.balance"):
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row # Allows accessing columns by name
+        c = conn.cursor()
+        
+        c.execute("SELECT * FROM accounts WHERE id=?", (account_id,))
+        row = c.fetchone()
+        conn.close()
     
     if row:
         # Convert Row object to dict
         return dict(row)
     
     # Fallback for demo continuity if UUID is new/dynamic
-    print(f"[MCP SQL] ID {account_id} not found. Returning demo default.")
+    logger.info(f"[MCP SQL] ID {account_id} not found. Returning demo default.")
     return {
         "id": account_id,
         "holder_name": "John Doe (Default)",
@@ -63,7 +68,11 @@ def transfer_funds(sender_id: str, receiver_id: str, amount: float):
     Executes a Secure SQL Transaction.
     Inputs: sender_id, receiver_id, amount
     """
-    print(f"\n[MCP SQL] Processing Transfer: ${amount} from {sender_id} to {receiver_id}")
+    logger.info(f"[MCP SQL] Processing Transfer: ${amount} from {sender_id} to {receiver_id}")
+    with telemetry.span("sql.accounts.transfer"):
+        return _transfer(sender_id, receiver_id, amount)
+
+def _transfer(sender_id: str, receiver_id: str, amount: float):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
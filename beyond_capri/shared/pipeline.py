@@ -0,0 +1,76 @@
+import time
+import logging
+from beyond_capri.local_env.reidentify import re_identify_response
+from beyond_capri.cloud_env.prompts import check_request
+from beyond_capri.shared import telemetry, profiling
+
+logger = logging.getLogger(__name__)
+
+# Phases of one request, in order
+PHASES = ("sanitize", "orchestrate", "reidentify")
+
+def process_request(gatekeeper, orchestrator, vault, user_input: str, request_id: str = None,
+                    on_phase=None, safe_prompt: str = None, session=None, on_token=None,
+                    profile: bool = None) -> dict:
+    """
+    Runs one prompt through the whole privacy pipeline:
+    Gatekeeper -> A2AOrchestrator -> re-identification.
+
+    on_phase(phase, result) is called after each phase (for progress reporting).
+    Passing safe_prompt skips the Gatekeeper (the batch runner sanitizes whole
+    groups up front). A ConversationSession carries entities, anchors and recent
+    turns across calls. on_token(text) receives the (still pseudonymized) final
+    answer as the cloud streams it. profile=True / False forces profiling of
+    this request on or off (default: the PROFILE_RATE sample, see profiling.py).
+    Raises ValueError for a request over its token budget (see prompts.py).
+    Returns the intermediate texts plus per-phase timings in seconds.
+    """
+    timings = {}
+    with telemetry.request_context(request_id) as rid, telemetry.span("pipeline.request"), \
+            profiling.request(rid, force=profile):
+        result = {"request_id": rid, "input": user_input}
+
+        # 1. Local Shield (an over-long request is refused before any work, never cut)
+        offsets = None
+        if safe_prompt is None:
+            check_request(user_input)
+            start = time.perf_counter()
+            with profiling.phase("sanitize"):
+                masked = gatekeeper.sanitize_with_offsets(user_input, session=session)
+            result["safe_prompt"], offsets = masked.text, masked.offsets
+            timings["sanitize"] = time.perf_counter() - start
+        else:
+            result["safe_prompt"] = safe_prompt
+        if on_phase:
+            on_phase("sanitize", result)
+
+        # 2. Cloud A2A reasoning
+        start = time.perf_counter()
+        with profiling.phase("orchestrate"):
+            if session is not None:
+                state = orchestrator.run(result["safe_prompt"], request_id=rid, on_token=on_token,
+                                         anchors=session.cached_anchors(), history=session.history())
+                session.remember_anchors(state.get("semantic_anchors", {}))
+                session.add_turn(result["safe_prompt"], state["final_response"])
+            else:
+                state = orchestrator.run(result["safe_prompt"], request_id=rid, on_token=on_token)
+        timings["orchestrate"] = time.perf_counter() - start
+        result["coordinator_plan"] = state.get("current_instruction", "")
+        result["cloud_response"] = state["final_response"]
+        result["token_usage"] = state.get("token_usage", {})
+        result["tools_called"] = state.get("tools_called", [])
+        if on_phase:
+            on_phase("orchestrate", result)
+
+        # 3. Local re-identification
+        start = time.perf_counter()
+        with profiling.phase("reidentify"):
+            result["final_response"] = re_identify_response(result["cloud_response"], vault, offsets)
+        timings["reidentify"] = time.perf_counter() - start
+        if on_phase:
+            on_phase("reidentify", result)
+
+    result["timings"] = timings
+    for phase, seconds in timings.items():
+        telemetry.observe("pipeline_phase_seconds", seconds, phase=phase)
+    return result
@@ -0,0 +1,238 @@
+"""
+Per-request profiling for the privacy pipeline.
+
+    profiling.configure(mode="sample", rate=0.1)      # or PROFILE_MODE / PROFILE_RATE
+    with profiling.request(request_id):
+        with profiling.phase("sanitize"):
+            gatekeeper.sanitize_with_offsets(...)
+
+Modes:
+  * "sample": a single daemon thread reads the stacks of the threads running
+    profiled requests (sys._current_frames) every PROFILE_INTERVAL_MS and
+    writes <PROFILE_DIR>/<request_id>.collapsed, one "frame;frame;... count"
+    line per distinct stack, ready for flamegraph.pl or speedscope. Each stack
+    is rooted at the pipeline phase it was taken in, so the flame graph splits
+    into sanitize / orchestrate / reidentify first.
+  * "cprofile": deterministic cProfile of the request thread, written as
+    <request_id>.prof (pstats; snakeviz, flameprof, ...).
+
+Whether a request is profiled is decided once, when it starts: by `force`
+(on/off per request) or else by a PROFILE_RATE coin flip. force=True works even
+with the mode "off" (it then samples stacks), so one caller can profile its own
+requests without changing the process-wide settings. Otherwise, with the mode
+"off", request() and phase() return a shared no-op context manager.
+"""
+import os
+import sys
+import time
+import random
+import cProfile
+import logging
+import threading
+import contextvars
+from collections import Counter
+from config import Config
+from beyond_capri.shared import telemetry
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "sample", "cprofile")
+
+def _checked_mode(mode: str) -> str:
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode {mode!r}, expected one of {MODES}")
+    return mode
+
+_settings = {
+    "mode": _checked_mode(Config.PROFILE_MODE),
+    "rate": Config.PROFILE_RATE,
+    "interval": Config.PROFILE_INTERVAL_MS / 1000.0,
+    "out_dir": Config.PROFILE_DIR,
+}
+_active = contextvars.ContextVar("profile", default=None)
+
+def configure(mode: str = None, rate: float = None, interval_ms: float = None, out_dir: str = None):
+    """Overrides the Config defaults (entry-point switches call this once at startup)."""
+    if mode is not None:
+        _settings["mode"] = _checked_mode(mode)
+    if rate is not None:
+        _settings["rate"] = rate
+    if interval_ms is not None:
+        _settings["interval"] = interval_ms / 1000.0
+    if out_dir is not None:
+        _settings["out_dir"] = out_dir
+
+def enabled() -> bool:
+    return _settings["mode"] != "off"
+
+def settings() -> dict:
+    return dict(_settings)
+
+class _NullContext:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullContext()
+
+# --- STACK SAMPLER ---
+class _Sampler:
+    """One process-wide thread sampling every registered request thread."""
+    def __init__(self):
+        self._targets = {}
+        self._labels = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def register(self, thread_id: int, profile):
+        with self._lock:
+            self._targets[thread_id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="profiler-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def unregister(self, thread_id: int):
+        with self._lock:
+            self._targets.pop(thread_id, None)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            # ';' separates frames in the collapsed format
+            label = self._labels[code] = (
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+            )
+        return label
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                targets = dict(self._targets)
+            if not targets:
+                # Idle until the next profiled request starts
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            frames = sys._current_frames()
+            for thread_id, profile in targets.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                profile.add_sample(stack)
+            time.sleep(_settings["interval"])
+
+_sampler = _Sampler()
+
+# --- PER-REQUEST PROFILES ---
+class _Profile:
+    def __init__(self, request_id: str, mode: str):
+        self.request_id = request_id or "request"
+        self.mode = mode
+        self.phase = "request"
+        self.samples = Counter()
+        self.thread_id = threading.get_ident()
+        self.base_depth = 0
+        self.profiler = None
+        self.path = None
+
+    def add_sample(self, stack: list):
+        # Frames above the request() call (main loop, executor plumbing) are the same
+        # in every sample; drop them and root the stack at the current phase instead
+        self.samples[";".join([self.phase] + stack[self.base_depth:])] += 1
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        if self.mode == "cprofile":
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active cProfile per process
+                logger.warning(f"[Profiler] Another cProfile is active, {self.request_id} is not profiled")
+                self.profiler = None
+        else:
+            frame, depth = sys._getframe(1), 0
+            while frame is not None:
+                depth += 1
+                frame = frame.f_back
+            self.base_depth = depth
+            _sampler.register(self.thread_id, self)
+        self.token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _active.reset(self.token)
+        if self.profiler is not None:
+            self.profiler.disable()
+        elif self.mode == "sample":
+            _sampler.unregister(self.thread_id)
+        try:
+            self.write()
+        except OSError as e:
+            logger.error(f"[Profiler] Could not write profile for {self.request_id}: {e}")
+        return False
+
+    def write(self):
+        elapsed = time.perf_counter() - self.start
+        os.makedirs(_settings["out_dir"], exist_ok=True)
+        base = os.path.join(_settings["out_dir"], self.request_id)
+        if self.profiler is not None:
+            self.path = base + ".prof"
+            self.profiler.dump_stats(self.path)
+        elif self.mode == "sample":
+            self.path = base + ".collapsed"
+            with open(self.path, "w", encoding="utf-8") as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        else:
+            return
+        telemetry.increment("profiles_captured_total", mode=self.mode)
+        logger.info(f"[Profiler] {self.request_id}: {elapsed:.2f}s profiled -> {self.path}")
+
+class _Phase:
+    __slots__ = ("profile", "name", "previous")
+
+    def __init__(self, profile: _Profile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.previous = self.profile.phase
+        self.profile.phase = self.name
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.phase = self.previous
+        return False
+
+def request(request_id: str = None, force: bool = None):
+    """
+    Profiles the enclosed request when force is True, or when the mode is on
+    and the PROFILE_RATE coin flip says so; force=False never profiles.
+    """
+    mode = _settings["mode"]
+    if force is True:
+        if _active.get() is not None:
+            return _NULL
+        return _Profile(request_id, "sample" if mode == "off" else mode)
+    if mode == "off" or force is False or _active.get() is not None:
+        return _NULL
+    if random.random() >= _settings["rate"]:
+        return _NULL
+    return _Profile(request_id, mode)
+
+def phase(name: str):
+    """Labels samples taken inside the block with a pipeline phase."""
+    profile = _active.get()
+    if profile is None:
+        return _NULL
+    return _Phase(profile, name)
@@ -0,0 +1,270 @@
+"""
+Lightweight tracing and metrics for the privacy pipeline.
+
+    with telemetry.span("llm.ollama.chat", model="gemma3:1b"):
+        ...
+    telemetry.increment("vault_writes_total")
+    telemetry.observe("prompt_tokens", 812, node="coordinator")
+
+Every span feeds the 'span_duration_seconds' histogram (label: span) and, when
+TELEMETRY_JSONL is set, appends one JSON line per finished span. Request ids
+travel in a context variable (and in AgentState across the LangGraph nodes).
+With TELEMETRY_ENABLED=0, span() hands back a shared no-op context manager.
+"""
+import re
+import json
+import time
+import uuid
+import bisect
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from config import Config
+
+# Seconds; covers sub-ms SQL lookups up to multi-second LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Raw samples kept per histogram series for percentile queries
+RESERVOIR_SIZE = 10000
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_span_stack = contextvars.ContextVar("span_stack", default=())
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+        self.samples.append(value)
+
+    def percentile(self, q: float):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q / 100.0 * len(ordered)), len(ordered) - 1)]
+
+class _NullSpan:
+    """Returned by span() when telemetry is off; costs one attribute lookup."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("registry", "name", "attrs", "start", "token")
+
+    def __init__(self, registry, name, attrs):
+        self.registry = registry
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Attach attributes discovered mid-span (token counts, hit/miss, ...)."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.token = _span_stack.set(_span_stack.get() + (self.name,))
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        parents = _span_stack.get()[:-1]
+        _span_stack.reset(self.token)
+        self.registry._finish_span(self, duration, parents, exc)
+        return False
+
+class Telemetry:
+    def __init__(self, enabled: bool = True, jsonl_path: str = None):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._jsonl = None
+        self._jsonl_path = None
+        if jsonl_path:
+            self.set_jsonl_path(jsonl_path)
+
+    # --- Configuration ---
+    def configure(self, enabled: bool = None, jsonl_path: str = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if jsonl_path is not None:
+            self.set_jsonl_path(jsonl_path)
+
+    def set_jsonl_path(self, path: str):
+        with self._lock:
+            if self._jsonl:
+                self._jsonl.close()
+            self._jsonl_path = path
+            self._jsonl = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # --- Recording ---
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets=DEFAULT_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    def _finish_span(self, span: _Span, duration: float, parents: tuple, exc):
+        self.observe("span_duration_seconds", duration, span=span.name)
+        if exc is not None:
+            self.increment("span_errors_total", span=span.name)
+        if self._jsonl is None:
+            return
+        record = {
+            "ts": time.time(),
+            "span": span.name,
+            "duration_ms": round(duration * 1000, 3),
+            "request_id": _request_id.get(),
+            "parent": parents[-1] if parents else None,
+            "attrs": span.attrs,
+        }
+        if exc is not None:
+            record["error"] = f"{type(exc).__name__}: {exc}"
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self._jsonl:
+                self._jsonl.write(line + "\n")
+
+    # --- Reading ---
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def percentiles(self, name: str, qs=(50, 95, 99), **labels) -> dict:
+        with self._lock:
+            hist = self._histograms.get((name, tuple(sorted(labels.items()))))
+            if hist is None:
+                return {}
+            return {f"p{q}": hist.percentile(q) for q in qs}
+
+    def summary(self) -> dict:
+        """Counters and per-series histogram stats as plain dicts (for JSON reports)."""
+        def series(name, labels):
+            if not labels:
+                return name
+            return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+        with self._lock:
+            counters = {series(n, l): v for (n, l), v in self._counters.items()}
+            histograms = {
+                series(n, l): {
+                    "count": h.count,
+                    "sum": h.total,
+                    "p50": h.percentile(50),
+                    "p95": h.percentile(95),
+                    "p99": h.percentile(99),
+                }
+                for (n, l), h in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def export_prometheus(self, prefix: str = "beyond_capri") -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        def metric(name):
+            return f"{prefix}_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+        def escape(value):
+            # The text format requires \\, \" and \n inside label values
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        def labels(pairs, extra=()):
+            pairs = tuple(pairs) + tuple(extra)
+            if not pairs:
+                return ""
+            body = ",".join(f'{re.sub(r"[^a-zA-Z0-9_]", "_", str(k))}="{escape(v)}"' for k, v in pairs)
+            return "{" + body + "}"
+
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, lbls), value in sorted(self._counters.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {metric(name)} counter")
+                    seen.add(name)
+                lines.append(f"{metric(name)}{labels(lbls)} {value}")
+
+            seen = set()
+            for (name, lbls), hist in sorted(self._histograms.items(), key=lambda kv: kv[0]):
+                if name not in seen:
+                    lines.append(f"# TYPE {metric(name)} histogram")
+                    seen.add(name)
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f"{metric(name)}_bucket{labels(lbls, [('le', bound)])} {cumulative}")
+                lines.append(f"{metric(name)}_bucket{labels(lbls, [('le', '+Inf')])} {hist.count}")
+                lines.append(f"{metric(name)}_sum{labels(lbls)} {hist.total}")
+                lines.append(f"{metric(name)}_count{labels(lbls)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.export_prometheus())
+
+# --- Request ids ---
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+def current_request_id():
+    return _request_id.get()
+
+@contextmanager
+def request_context(request_id: str = None):
+    """Binds a request id for everything recorded inside the block."""
+    token = _request_id.set(request_id or _request_id.get() or new_request_id())
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(token)
+
+# --- Process-wide default registry ---
+_default = Telemetry(enabled=Config.TELEMETRY_ENABLED, jsonl_path=Config.TELEMETRY_JSONL)
+
+def get_telemetry() -> Telemetry:
+    return _default
+
+span = _default.span
+increment = _default.increment
+observe = _default.observe
+configure = _default.configure
+summary = _default.summary
+percentiles = _default.percentiles
+export_prometheus = _default.export_prometheus
+write_prometheus = _default.write_prometheus
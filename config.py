@@ -12,12 +12,90 @@ class Config:
     # Pinecone Config
     PINECONE_ENV = os.getenv("PINECONE_ENV", "us-east-1")
     PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "beyond-capri-context")
+
+    # Index Partitioning
+    # Identity anchors and document chunks live in separate namespaces so that
+    # KB queries never scan identity vectors. A tenant prefix isolates deployments.
+    PINECONE_TENANT = os.getenv("PINECONE_TENANT", "")
+    IDENTITY_NAMESPACE = os.getenv("IDENTITY_NAMESPACE", "identities")
+    DOCUMENT_NAMESPACE = os.getenv("DOCUMENT_NAMESPACE", "documents")
+    
+    # Vector Backend: "pinecone" (cloud) or "local" (NumPy index on disk)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+    # Local index storage: float32, float16 or int8 (scalar quantized, per-vector scales)
+    LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32")
+    # Quantized scans shortlist top_k * this many rows for the exact float32 rerank
+    LOCAL_INDEX_RERANK = int(os.getenv("LOCAL_INDEX_RERANK", "4"))
+    
+    # Telemetry (see beyond_capri/shared/telemetry.py)
+    # TELEMETRY_ENABLED=0 turns every span/counter into a no-op
+    TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") != "0"
+    TELEMETRY_JSONL = os.getenv("TELEMETRY_JSONL")
+    # Prometheus text file written by main.py when a run finishes
+    TELEMETRY_PROMETHEUS = os.getenv("TELEMETRY_PROMETHEUS")
+    
+    # LLM client limits (see beyond_capri/shared/llm_client.py)
+    # Concurrency caps and requests-per-minute budgets per provider; rpm 0 = unthrottled
+    LLM_LIMITS = {
+        "groq": {
+            "concurrency": int(os.getenv("GROQ_MAX_CONCURRENCY", "8")),
+            "rpm": float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30")),
+            "burst": int(os.getenv("GROQ_BURST", "5")),
+        },
+        "ollama": {
+            "concurrency": int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2")),
+            "rpm": float(os.getenv("OLLAMA_REQUESTS_PER_MINUTE", "0")),
+        },
+    }
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+    # Per-request timeout in seconds, applied on the ChatGroq / ollama transports
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+    
+    # Prompt token budgets per section (see beyond_capri/cloud_env/prompts.py)
+    PROMPT_BUDGETS = {
+        "request": int(os.getenv("PROMPT_BUDGET_REQUEST", "400")),
+        "anchors": int(os.getenv("PROMPT_BUDGET_ANCHORS", "200")),
+        "history": int(os.getenv("PROMPT_BUDGET_HISTORY", "400")),
+        "plan": int(os.getenv("PROMPT_BUDGET_PLAN", "300")),
+        "tool_result": int(os.getenv("PROMPT_BUDGET_TOOL_RESULT", "400")),
+        "kb": int(os.getenv("PROMPT_BUDGET_KB", "600")),
+    }
+    
+    # Identity vault in-memory front (see beyond_capri/local_env/vault_cache.py)
+    VAULT_CACHE_SIZE = int(os.getenv("VAULT_CACHE_SIZE", "4096"))
+    VAULT_BLOOM_FP_RATE = float(os.getenv("VAULT_BLOOM_FP_RATE", "0.01"))
+    VAULT_BLOOM_MIN_CAPACITY = int(os.getenv("VAULT_BLOOM_MIN_CAPACITY", "100000"))
+    # How stale the filter may get w.r.t. rows written by other processes
+    VAULT_BLOOM_SYNC_S = float(os.getenv("VAULT_BLOOM_SYNC_S", "1.0"))
+    
+    # Vault retention (see beyond_capri/local_env/retention.py)
+    # TTL per entity type, e.g. "PERSON=30d,ORG=180d,*=90d"; unset keeps identities forever
+    VAULT_TTL = os.getenv("VAULT_TTL", "")
+    VAULT_PURGE_BATCH = int(os.getenv("VAULT_PURGE_BATCH", "500"))
+    VAULT_PURGE_INTERVAL_S = float(os.getenv("VAULT_PURGE_INTERVAL_S", "3600"))
+    VAULT_VACUUM_PAGES = int(os.getenv("VAULT_VACUUM_PAGES", "1000"))
+    
+    # Profiling (see beyond_capri/shared/profiling.py)
+    # "off", "sample" (stack sampling -> collapsed stacks) or "cprofile"
+    PROFILE_MODE = os.getenv("PROFILE_MODE", "off")
+    # Share of requests profiled when a mode is on (1.0 = every request)
+    PROFILE_RATE = float(os.getenv("PROFILE_RATE", "1.0"))
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "profiles"))
     
     # Local Paths
     DB_PATH = os.path.join(os.path.dirname(__file__), "beyond_capri", "local_env", "identity_vault.db")
+    LOCAL_INDEX_DIR = os.getenv(
+        "LOCAL_INDEX_DIR",
+        os.path.join(os.path.dirname(__file__), "beyond_capri", "local_env", "vector_index")
+    )
+    # Optional snapshot directory (see run_snapshot.py) mapped at startup when
+    # LOCAL_INDEX_DIR is still empty, instead of re-running ingestion
+    LOCAL_INDEX_SNAPSHOT = os.getenv("LOCAL_INDEX_SNAPSHOT")
 
     # Validation
-    if not PINECONE_API_KEY:
+    if VECTOR_BACKEND == "pinecone" and not PINECONE_API_KEY:
         raise ValueError("Missing PINECONE_API_KEY in .env file")
 
 print(f"Configuration Loaded. DB Path: {Config.DB_PATH}")
\ No newline at end of file
@@ -1,53 +1,24 @@
-import re
-import uuid
+import logging
+import argparse
+from config import Config
 from beyond_capri.cloud_env.a2a_orchestrator import A2AOrchestrator
+from beyond_capri.cloud_env import prompts
 from beyond_capri.local_env.gatekeeper import Gatekeeper
 from beyond_capri.local_env.db_manager import IdentityVault
-
-def re_identify_response(text: str, vault: IdentityVault) -> str:
-    """
-    PHASE 4 MAGIC: Scans the text for UUIDs, looks them up in the Vault,
-    and replaces the fake pseudonym context with Real Data.
-    """
-    print("\n[Re-ID Layer] Scanning output for UUIDs to restore real identities...")
-    
-    # Regex to find UUID-like strings (both 'Entity_...' and raw 8-char hex)
-    # Adjust regex to match the UUID format your system generates
-    matches = re.findall(r"(Entity_)?[a-f0-9]{8}", text)
-    
-    # Clean matches to get the full raw UUID string found in text
-    # We re-run a simpler regex to capture the exact substrings to replace
-    exact_matches = re.findall(r"Entity_[a-f0-9]{8}|[a-f0-9]{8}", text)
-    
-    final_text = text
-    
-    for match_str in exact_matches:
-        # Try to find this ID in the database
-        # Note: Sometimes the tool strips 'Entity_', so we check both variations
-        real_identity = vault.get_real_identity(match_str)
-        
-        # If not found directly, try adding/removing prefix
-        if not real_identity:
-            if "Entity_" in match_str:
-                real_identity = vault.get_real_identity(match_str.replace("Entity_", ""))
-            else:
-                real_identity = vault.get_real_identity(f"Entity_{match_str}")
-
-        if real_identity:
-            original_name = real_identity.get("original_text", "Unknown")
-            print(f"   -> Found UUID '{match_str}'. Restoring to '{original_name}'")
-            
-            # 1. Replace the UUID with the Name
-            final_text = final_text.replace(match_str, original_name)
-            
-            # 2. CLEANUP: Remove the fake "David Smith" artifacts if possible
-            # (Simple heuristic: If we restored 'Sarah', replace 'David Smith' with 'Sarah')
-            final_text = final_text.replace("David Smith", original_name)
-            final_text = final_text.replace("Male", real_identity.get("full_context", "").split(",")[0])
-            
-    return final_text
+from beyond_capri.local_env.reidentify import re_identify_response
+from beyond_capri.local_env.session import ConversationSession
+from beyond_capri.local_env.retention import VaultRetention
+from beyond_capri.shared import telemetry, profiling
 
 def main():
+    parser = argparse.ArgumentParser(description="Beyond CAPRI interactive session")
+    parser.add_argument("--profile", choices=profiling.MODES,
+                        help="Profile each turn: 'sample' writes collapsed stacks, 'cprofile' .prof files")
+    parser.add_argument("--profile-rate", type=float, help="Share of turns profiled (default: PROFILE_RATE)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    profiling.configure(mode=args.profile, rate=args.profile_rate)
     print("===============================================================")
     print("   BEYOND CAPRI: PRIVACY-PRESERVING A2A FRAMEWORK (LIVE)      ")
     print("===============================================================")
@@ -56,23 +27,58 @@ def main():
     gatekeeper = Gatekeeper()
     orchestrator = A2AOrchestrator()
     vault = IdentityVault()
+    session = ConversationSession()
+    # Expires old identities in the background when VAULT_TTL is set
+    retention = VaultRetention(vault=vault, index=orchestrator.index)
+    retention.start()
     
-    # 2. Get User Input
-    print("\nENTER PROMPT (e.g., 'Book appointment for Sarah...'):")
-    user_input = input("> ")
-    if not user_input:
-        user_input = "Please schedule a follow-up for Sarah Jones. She is a female patient."
+    # 2. Conversation loop: each turn re-uses the session's entities and anchors
+    first_turn = True
+    while True:
+        print("\nENTER PROMPT (e.g., 'Book appointment for Sarah...'; empty or 'exit' to quit):")
+        try:
+            user_input = input("> ").strip()
+        except EOFError:
+            break
+        if not user_input and first_turn:
+            user_input = "Please schedule a follow-up for Sarah Jones. She is a female patient."
+        if not user_input or user_input.lower() in ("exit", "quit"):
+            break
+        first_turn = False
+        with telemetry.request_context() as rid, profiling.request(rid):
+            _run_turn(gatekeeper, orchestrator, vault, session, user_input)
     
+    retention.stop()
+    print(f"\n[Session] {session.describe()}")
+    if Config.TELEMETRY_PROMETHEUS:
+        telemetry.write_prometheus(Config.TELEMETRY_PROMETHEUS)
+
+def _run_turn(gatekeeper, orchestrator, vault, session, user_input):
     # --- PHASE 2: LOCAL SHIELD ---
     print(f"\n[1] LOCAL SHIELD: Detecting PII...")
-    safe_prompt = gatekeeper.detect_and_sanitize(user_input)
+    try:
+        prompts.check_request(user_input)
+    except ValueError as e:
+        print(f"Request rejected: {e}")
+        return
+    try:
+        with profiling.phase("sanitize"):
+            masked = gatekeeper.sanitize_with_offsets(user_input, session=session)
+    except Exception as e:
+        print(f"Local Shield Error: {e}")
+        return
+    safe_prompt = masked.text
     print(f"    Safe Prompt sent to Cloud: \"{safe_prompt}\"")
     
     # --- PHASE 3: CLOUD A2A REASONING ---
     print(f"\n[2] CLOUD TEAM: Reasoning & Execution...")
     try:
-        result = orchestrator.run(safe_prompt)
+        with profiling.phase("orchestrate"):
+            result = orchestrator.run(safe_prompt, request_id=telemetry.current_request_id(),
+                                      anchors=session.cached_anchors(), history=session.history())
         raw_cloud_response = result['final_response']
+        session.remember_anchors(result.get('semantic_anchors', {}))
+        session.add_turn(safe_prompt, raw_cloud_response)
         print(f"\n[Raw Cloud Response (Internal)]:\n{raw_cloud_response}")
     except Exception as e:
         print(f"Cloud Error: {e}")
@@ -80,7 +86,8 @@ def main():
 
     # --- PHASE 4: RE-IDENTIFICATION ---
     print(f"\n[3] LOCAL BRIDGE: Restoring Real Identity...")
-    final_user_output = re_identify_response(raw_cloud_response, vault)
+    with profiling.phase("reidentify"):
+        final_user_output = re_identify_response(raw_cloud_response, vault, masked.offsets)
     
     print("\n" + "="*60)
     print("FINAL USER RESULT:")
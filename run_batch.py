@@ -0,0 +1,36 @@
+"""
+Wrapper script to run a batch of prompts through the pipeline from the project root.
+Input is JSONL with {"id": ..., "prompt": ...} per line; rerunning with the same
+output file resumes where a previous run stopped. Records whose last line is an
+error are retried, and the new line is appended after the old one: when reading
+the results, the last line per id wins.
+
+Usage:
+    python run_batch.py prompts.jsonl results.jsonl --concurrency 8 --group-size 32
+    python run_batch.py prompts.jsonl results.jsonl --profile sample --profile-rate 0.05
+"""
+import sys
+import os
+import logging
+import argparse
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Now import and run
+from beyond_capri.shared.batch_runner import run_batch
+from beyond_capri.shared import profiling
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of prompts")
+    parser.add_argument("output", help="JSONL results file (also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--group-size", type=int, default=32, help="Prompts sanitized per Gatekeeper batch")
+    parser.add_argument("--profile", choices=profiling.MODES, help="Profile records (default: PROFILE_MODE)")
+    parser.add_argument("--profile-rate", type=float, help="Share of records profiled (default: PROFILE_RATE)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    profiling.configure(mode=args.profile, rate=args.profile_rate)
+    run_batch(args.input, args.output, concurrency=args.concurrency, group_size=args.group_size)
@@ -4,6 +4,7 @@ This ensures proper module resolution for beyond_capri package.
 """
 import sys
 import os
+import logging
 
 # Add project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -12,4 +13,5 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from beyond_capri.local_env.ingest_docs import ingest_documents
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     ingest_documents()
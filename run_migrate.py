@@ -0,0 +1,16 @@
+"""
+Wrapper script to move existing vectors into the identity / document namespaces.
+Usage: python run_migrate.py [--dry-run]
+"""
+import sys
+import os
+import logging
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from beyond_capri.local_env.migrate_namespaces import migrate_to_namespaces
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    migrate_to_namespaces(dry_run="--dry-run" in sys.argv)
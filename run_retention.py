@@ -0,0 +1,33 @@
+"""
+Wrapper script to purge expired identities (VAULT_TTL) from the project root.
+
+Usage:
+    python run_retention.py                               # purge + incremental vacuum
+    python run_retention.py --stats                       # only print vault stats
+    python run_retention.py --enable-incremental-vacuum   # one-time conversion (full, blocking VACUUM)
+"""
+import sys
+import os
+import json
+import logging
+import argparse
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from beyond_capri.local_env.retention import VaultRetention
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stats", action="store_true", help="Print stats without purging")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Convert the vault to auto_vacuum=INCREMENTAL (rewrites the file; stop the app first)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    retention = VaultRetention()
+    if args.enable_incremental_vacuum:
+        retention.ensure_incremental_vacuum()
+    if not args.stats:
+        print(f"[Retention] Run: {retention.run_once()}")
+    print(json.dumps(retention.stats(), indent=2))
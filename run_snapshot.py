@@ -0,0 +1,30 @@
+"""
+Wrapper script to export / import vector index snapshots from the project root.
+Usage:
+    python run_snapshot.py export <path>[.npz] [namespace ...]
+    python run_snapshot.py import <path>[.npz]
+
+A directory snapshot can also be mapped directly at startup by the local
+backend: VECTOR_BACKEND=local LOCAL_INDEX_SNAPSHOT=<path>
+"""
+import sys
+import os
+import logging
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from beyond_capri.local_env.vector_store import open_index
+from beyond_capri.local_env.index_snapshot import export_snapshot, import_snapshot
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if len(sys.argv) < 3 or sys.argv[1] not in ("export", "import"):
+        print(__doc__)
+        sys.exit(1)
+
+    index = open_index()
+    if sys.argv[1] == "export":
+        export_snapshot(index, sys.argv[2], namespaces=sys.argv[3:] or None)
+    else:
+        import_snapshot(index, sys.argv[2])
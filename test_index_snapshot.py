@@ -0,0 +1,50 @@
+"""
+Snapshot round trips for the local vector index.
+Run: python -m pytest test_index_snapshot.py
+"""
+import os
+os.environ.setdefault("VECTOR_BACKEND", "local")
+
+import numpy as np
+from beyond_capri.local_env.local_index import LocalVectorIndex
+from beyond_capri.local_env.index_snapshot import export_snapshot, import_snapshot
+
+DIM = 8  # deliberately not the 384 default
+
+def _source():
+    rng = np.random.default_rng(0)
+    index = LocalVectorIndex(dimension=DIM)
+    index.upsert_arrays([f"a{i}" for i in range(5)], rng.normal(size=(5, DIM)),
+                        [{"type": "identity", "n": i} for i in range(5)], namespace="identities")
+    index.upsert_arrays(["d0", "d1"], rng.normal(size=(2, DIM)), namespace="documents")
+    return index
+
+def _assert_same(source, copy):
+    assert copy.dimension == DIM
+    assert sorted(copy.partitions) == sorted(source.partitions)
+    for namespace in source.partitions:
+        ids, vectors, metadata = source.export_arrays(namespace)
+        copy_ids, copy_vectors, copy_metadata = copy.export_arrays(namespace)
+        assert copy_ids == ids
+        assert copy_metadata == metadata
+        np.testing.assert_allclose(copy_vectors, vectors, atol=1e-6)
+
+def test_directory_snapshot_keeps_dimension(tmp_path):
+    source = _source()
+    path = str(tmp_path / "snap")
+    assert export_snapshot(source, path) == 7
+
+    copy = LocalVectorIndex(snapshot=path)
+    _assert_same(source, copy)
+    match = copy.query(source.fetch(["a3"], namespace="identities").vectors["a3"].values,
+                       top_k=1, namespace="identities").matches[0]
+    assert match.id == "a3"
+
+def test_npz_snapshot_round_trip(tmp_path):
+    source = _source()
+    path = str(tmp_path / "snap.npz")
+    export_snapshot(source, path)
+
+    target = LocalVectorIndex(dimension=DIM)
+    assert import_snapshot(target, path) == 7
+    _assert_same(source, target)
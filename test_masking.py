@@ -0,0 +1,34 @@
+"""
+Span masking: token boundaries and the leak re-scan.
+Run: python -m pytest test_masking.py
+"""
+from beyond_capri.local_env.masking import mask
+
+def test_short_name_inside_longer_word_is_not_masked():
+    result = mask("Alice asked Ali about the Limit for Li.", {"Ali": "Entity_aaaa1111", "Li": "Entity_bbbb2222"})
+    assert result.text == "Alice asked Entity_aaaa1111 about the Limit for Entity_bbbb2222."
+    assert result.offsets.restore(result.text) == "Alice asked Ali about the Limit for Li."
+
+def test_letter_digit_transitions_are_boundaries():
+    result = mask("Pay ACC12345 from Sarah123", {"12345": "Entity_cccc3333", "Sarah": "Entity_dddd4444"})
+    assert result.text == "Pay ACCEntity_cccc3333 from Entity_dddd4444123"
+
+def test_same_character_class_runs_are_not_boundaries():
+    result = mask("Account 123456 and 12345.", {"12345": "Entity_eeee5555"})
+    assert result.text == "Account 123456 and Entity_eeee5555."
+
+def test_longest_match_wins():
+    result = mask("Sarah Jones and Sarah", {"Sarah Jones": "Entity_ffff6666", "Sarah": "Entity_0000aaaa"})
+    assert result.text == "Entity_ffff6666 and Entity_0000aaaa"
+
+def test_leaked_finds_case_and_whitespace_variants():
+    replacements = {"Sarah Jones": "Entity_1111bbbb"}
+    result = mask("Sarah Jones wrote to SARAH  JONES and sarah\njones", replacements)
+    assert result.text.startswith("Entity_1111bbbb wrote")
+    assert result.leaked(replacements) == ["Sarah Jones"]
+
+def test_leaked_is_empty_when_everything_is_masked():
+    replacements = {"Ali": "Entity_2222cccc", "1a": "Entity_3333dddd"}
+    result = mask("Alice met Ali", replacements)
+    # 'Ali' inside 'Alice' is a different word; '1a' inside a pseudonym is not a leak
+    assert result.leaked(replacements) == []
@@ -1,3 +1,4 @@
+import logging
 import uuid
 from beyond_capri.local_env.db_manager import IdentityVault
 from beyond_capri.local_env.vector_store import AnchorStore
@@ -44,4 +45,5 @@ def run_phase1_test():
     print("\n=== PHASE 1 CHECK COMPLETE ===")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     run_phase1_test()
\ No newline at end of file
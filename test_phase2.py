@@ -1,3 +1,4 @@
+import logging
 import time
 from beyond_capri.local_env.gatekeeper import Gatekeeper
 from beyond_capri.local_env.db_manager import IdentityVault
@@ -57,4 +58,5 @@ def run_phase2_test():
     print("\n=== PHASE 2 COMPLETE ===")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     run_phase2_test()
\ No newline at end of file
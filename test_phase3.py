@@ -1,3 +1,4 @@
+import logging
 from beyond_capri.cloud_env.a2a_orchestrator import A2AOrchestrator
 from beyond_capri.local_env.gatekeeper import Gatekeeper
 from beyond_capri.local_env.db_manager import IdentityVault
@@ -38,4 +39,5 @@ def run_phase3_test():
         print("\n❌ FAILED: The Agent got confused by the fake data.")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     run_phase3_test()
\ No newline at end of file